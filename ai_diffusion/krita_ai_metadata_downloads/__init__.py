@@ -1,63 +1,54 @@
 """
 Module for custom features of the AI Diffusion extension
 Clear separation between base code and custom additions
+
+Exports are resolved lazily (PEP 562): importing the package does not load
+the feature modules, so startup only pays for what is actually used
 """
 
-from .metadata_panel import MetadataPanel
-from .auto_save import AutoSaveManager, auto_save_job_images, auto_save_all_history_images
-from .settings_extensions import AutoSaveSettingsWidget, MetadataSettingsWidget
-from .metadata_downloads_widget import MetadataDownloadsWidget
-from .integration import CustomFeaturesIntegration, custom_integration
-from .ui_widgets import (
-    CustomFeaturesTabWidget, AdvancedSettingsWidget, CustomFeaturesStatusWidget,
-    QuickConfigDialog, FeatureToggleWidget, CustomFeaturesToolbar,
-    create_metadata_panel, create_auto_save_settings, create_custom_features_tabs,
-    create_status_widget, create_toolbar
-)
-from .utils import MetadataFormatter, ImageTypeDetector, StyleManager
+import importlib
 
 __version__ = "1.0.0"
 __author__ = "Custom Developer"
 
-__all__ = [
-    # Classes principales
-    'MetadataPanel',
-    'AutoSaveManager', 
-    'CustomFeaturesIntegration',
-    
-    # Widgets d'interface de base
-    'AutoSaveSettingsWidget',
-    'MetadataSettingsWidget',
-    'MetadataDownloadsWidget',
-    
-    # Widgets UI personnalisés
-    'CustomFeaturesTabWidget',
-    'AdvancedSettingsWidget', 
-    'CustomFeaturesStatusWidget',
-    'QuickConfigDialog',
-    'FeatureToggleWidget',
-    'CustomFeaturesToolbar',
-    
-    # Classes utilitaires
-    'MetadataFormatter',
-    'ImageTypeDetector', 
-    'StyleManager',
-    
-    # Fonctions utilitaires
-    'auto_save_job_images',
-    'auto_save_all_history_images',
-    
-    # Factory functions pour UI
-    'create_metadata_panel',
-    'create_auto_save_settings', 
-    'create_custom_features_tabs',
-    'create_status_widget',
-    'create_toolbar',
-    
-    # Instances globales
-    'custom_integration',
-    
-    # Version et métadonnées
-    '__version__',
-    '__author__'
-] 
\ No newline at end of file
+# Nom exporté -> sous-module qui le définit
+_exports = {
+    'MetadataPanel': '.metadata_panel',
+    'AutoSaveManager': '.auto_save',
+    'auto_save_job_images': '.auto_save',
+    'auto_save_all_history_images': '.auto_save',
+    'AutoSaveSettingsWidget': '.settings_extensions',
+    'MetadataSettingsWidget': '.settings_extensions',
+    'MetadataDownloadsWidget': '.metadata_downloads_widget',
+    'CustomFeaturesIntegration': '.integration',
+    'custom_integration': '.integration',
+    'CustomFeaturesTabWidget': '.ui_widgets',
+    'AdvancedSettingsWidget': '.ui_widgets',
+    'CustomFeaturesStatusWidget': '.ui_widgets',
+    'QuickConfigDialog': '.ui_widgets',
+    'FeatureToggleWidget': '.ui_widgets',
+    'CustomFeaturesToolbar': '.ui_widgets',
+    'create_metadata_panel': '.ui_widgets',
+    'create_auto_save_settings': '.ui_widgets',
+    'create_custom_features_tabs': '.ui_widgets',
+    'create_status_widget': '.ui_widgets',
+    'create_toolbar': '.ui_widgets',
+    'MetadataFormatter': '.utils',
+    'ImageTypeDetector': '.utils',
+    'StyleManager': '.utils',
+}
+
+__all__ = list(_exports) + ['__version__', '__author__']
+
+
+def __getattr__(name):
+    module_name = _exports.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value  # cache pour les accès suivants
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -3,16 +3,251 @@ Module for automatic saving of generated images
 Custom feature to automatically save images according to their type
 """
 
+import hashlib
+import itertools
 import json
+import logging
+import os
+import queue
+import shutil
+import struct
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from pathlib import Path
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Dict, Optional, Set
+
+from PyQt5.QtCore import QBuffer, QByteArray
+from PyQt5.QtGui import QImageWriter
 
 from ..model import Model, Job, JobKind
 from ..settings import settings
 from ..util import client_logger as log
-from ..localization import _
 from .utils import MetadataFormatter, ImageTypeDetector
+from .config import get_config
+
+# Prefer orjson (C implementation, several times faster) when available
+try:
+    import orjson
+
+    def _dumps(obj) -> str:
+        return orjson.dumps(obj).decode('utf-8')
+except ImportError:
+    def _dumps(obj) -> str:
+        return json.dumps(obj, ensure_ascii=False, separators=(',', ':'))
+
+# Shared pool for image encoding/writing - PNG compression releases the GIL in Qt,
+# so saving a batch in parallel overlaps deflate work across cores
+_SAVE_POOL = ThreadPoolExecutor(max_workers=8)
+
+# Job kinds whose results are eligible for auto-save
+_ELIGIBLE_KINDS = frozenset({JobKind.diffusion, JobKind.animation, JobKind.upscaling})
+
+# Maps spaces and path-invalid characters to underscores in a single C-level pass
+_FN_TABLE = str.maketrans({
+    ' ': '_', '/': '_', '\\': '_', ':': '_', '*': '_',
+    '?': '_', '"': '_', '<': '_', '>': '_', '|': '_',
+})
+
+
+def _job_metadata_json(job: Job, image_type: str) -> str:
+    """
+    Serializes the job-level metadata once, without the per-image index
+    All fields except the index are identical across a batch
+    """
+    all_metadata = MetadataFormatter.prepare_for_save(job, 0, image_type)
+    all_metadata.pop("index", None)
+
+    # Limit total JSON size (max 4KB) - estimate from the values before
+    # serializing so the truncation path does not encode the payload twice
+    approx_size = sum(len(str(v)) for v in all_metadata.values())
+    if approx_size > 3500:
+        # Truncate keeping essential metadata
+        all_metadata = {
+            "prompt": all_metadata.get("prompt", ""),
+            "seed": all_metadata.get("seed", 0),
+            "strength": all_metadata.get("strength", 1.0),
+            "generation_type": all_metadata.get("generation_type", ""),
+            "timestamp": all_metadata.get("timestamp", ""),
+            "truncated": True
+        }
+
+    return _dumps(all_metadata)
+
+
+def _codec() -> tuple:
+    """Reads the configured save codec (png or webp) and quality"""
+    config = get_config()
+    codec = config.get_feature_setting("auto_save", "codec", "png")
+    quality = config.get_feature_setting("auto_save", "quality", 85)
+    if codec not in ("png", "webp"):
+        codec = "png"
+    return codec, quality
+
+
+def _encode_image(img, metadata: Dict[str, str], codec: str, quality: int) -> bytes:
+    """Encodes the image in memory, embedding the metadata text chunks"""
+    data = QByteArray()
+    buffer = QBuffer(data)
+    buffer.open(QBuffer.OpenModeFlag.WriteOnly)
+    writer = QImageWriter(buffer, QByteArray(codec.encode('utf-8')))
+    writer.setQuality(quality)
+    for key, value in metadata.items():
+        writer.setText(key, str(value))
+    if not writer.write(img._qimage):
+        raise Exception(f"Failed to encode image: {writer.errorString()}")
+    buffer.close()
+    return data.data()
+
+
+def _inject_png_text(png_bytes: bytes, key: str, text: str) -> bytes:
+    """
+    Appends a text chunk right before IEND in already-encoded PNG bytes
+    Skips Qt's metadata marshalling, which re-encodes the whole dict per image
+    tEXt/zTXt carry Latin-1 per the PNG spec, so they are only used for
+    ASCII-safe payloads; anything else is written as iTXt (UTF-8), which
+    round-trips accented prompts in every spec-conforming reader
+    """
+    iend = png_bytes.rfind(b'IEND')
+    if iend < 4:
+        return png_bytes
+    pos = iend - 4  # start of the IEND length field
+
+    key_b = key.encode('latin-1')
+    try:
+        data = text.encode('ascii')
+    except UnicodeEncodeError:
+        # iTXt layout: keyword, null, compression flag + method, empty
+        # language tag and translated keyword (null-terminated each), text
+        data = text.encode('utf-8')
+        chunk_type = b'iTXt'
+        if len(data) > 1024:
+            payload = key_b + b'\x00\x01\x00\x00\x00' + zlib.compress(data)
+        else:
+            payload = key_b + b'\x00\x00\x00\x00\x00' + data
+    else:
+        if len(data) > 1024:
+            chunk_type = b'zTXt'
+            payload = key_b + b'\x00\x00' + zlib.compress(data)
+        else:
+            chunk_type = b'tEXt'
+            payload = key_b + b'\x00' + data
+    crc = zlib.crc32(chunk_type + payload)
+    chunk = struct.pack('>I', len(payload)) + chunk_type + payload + struct.pack('>I', crc)
+    return png_bytes[:pos] + chunk + png_bytes[pos:]
+
+
+# Monotonic job sequence - several jobs with the same prompt and type can be
+# saved within the same second (bulk history export), and the timestamp alone
+# would make their filenames collide
+_job_seq = itertools.count()
+
+
+def _filename_prefix(job: Job) -> str:
+    """Builds the job-invariant part of the filename (prompt + timestamp)"""
+    prompt = str(getattr(job.params, 'name', 'image')).translate(_FN_TABLE)[:50]
+    # One timestamp per job - the sequence disambiguates jobs within the same
+    # second and the index keeps filenames unique within the batch
+    timestamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+    return f"{prompt}_{timestamp}-{next(_job_seq):04d}"
+
+
+def _batch_digest(job: Job) -> str:
+    """Content digest over the whole batch
+    Hashing only the first image would suppress batches whose first result
+    repeats while the remaining images are new"""
+    hasher = hashlib.blake2b(digest_size=8)
+    for img in job.results:
+        hasher.update(bytes(img.data))
+    return hasher.hexdigest()
+
+
+def _save_one(img, i: int, count: int, folder_str: str, image_type: str, prefix: str, base_json: str, codec: str = "png", quality: int = 85) -> int:
+    """Encodes and writes a single image with its metadata, returns 1 on success"""
+    path = None
+    try:
+        # Plain string concatenation - skips a Path construction per image
+        path = f"{folder_str}{prefix}_{image_type}_{i:03d}.{codec}"
+
+        # Debug: display each saved image (lazy %s formatting - skipped
+        # entirely when debug logging is off)
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("Auto-save: saving image %d/%d to %s", i + 1, count, path)
+
+        # Splice the per-image index into the pre-serialized job metadata
+        # instead of re-running json.dumps for every image of the batch
+        metadata_json = base_json[:-1] + f',"index":{i}}}'
+
+        # Encode to memory first, then flush to disk with a single write -
+        # letting Qt stream straight to the file issues many small syscalls
+        # For PNG, splice the metadata chunk into the raw bytes ourselves
+        # instead of going through QImageWriter's text-chunk plumbing
+        image_bytes = _encode_image(img, {}, codec, quality)
+        sidecar = None
+        if codec == "png":
+            image_bytes = _inject_png_text(image_bytes, "metadata", metadata_json)
+        else:
+            # Qt's webp writer silently drops setText chunks - keep the
+            # metadata in a .json sidecar next to the image instead
+            sidecar = f"{folder_str}{prefix}_{image_type}_{i:03d}.json"
+        with open(path, 'wb') as f:
+            f.write(image_bytes)
+        if sidecar is not None:
+            with open(sidecar, 'w', encoding='utf-8') as f:
+                f.write(metadata_json)
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("Auto-save: successfully saved %s with JSON metadata (%d chars)", path, len(metadata_json))
+        return 1
+
+    except Exception as e:
+        # path may not be assigned yet if the failure happened while building it
+        log.warning("Auto-save failed for %s (index %d): %s", path or folder_str, i, e)
+        return 0
+
+
+class _AutoSaveWorker:
+    """
+    Background writer consuming queued image saves
+    Lets the job-finished path return immediately instead of blocking the UI
+    """
+
+    def __init__(self, max_pending: int = 256):
+        self._queue: queue.Queue = queue.Queue(maxsize=max_pending)
+        self._thread = threading.Thread(target=self._loop, name="auto-save-writer", daemon=True)
+        self._thread.start()
+
+    def put(self, img, i: int, count: int, folder_str: str, image_type: str, prefix: str, base_json: str, codec: str, quality: int):
+        self._queue.put((img, i, count, folder_str, image_type, prefix, base_json, codec, quality))
+
+    def _loop(self):
+        while True:
+            item = self._queue.get()
+            try:
+                _save_one(*item)
+            except Exception as e:
+                log.warning(f"Auto-save worker failed: {e}")
+            finally:
+                self._queue.task_done()
+
+
+_worker = _AutoSaveWorker()
+
+
+@dataclass(frozen=True)
+class _SaveCtx:
+    """
+    Session-invariant state resolved once per save operation
+    Avoids re-reading settings and the document filename for every job
+    """
+    base: Path
+    doc_stem: str
+    enabled: bool
+
+    @property
+    def doc_folder(self) -> Path:
+        return self.base / self.doc_stem
 
 
 class AutoSaveManager:
@@ -23,135 +258,201 @@ class AutoSaveManager:
     
     def __init__(self, model: Model):
         self._model = model
+        # Folders already created during this session - skips mkdir on the hot path
+        self._created_folders: Set[Path] = set()
     
-    def save_job_images(self, job: Job) -> int:
+    def save_job_images(self, job: Job, doc_folder: Optional[Path] = None) -> int:
         """
         Automatically saves images from a completed job
         Returns the number of saved images
         """
         if not settings.auto_save_generated:
             return 0
-        
+
         if not job.results:
             return 0
-        
-        # Debug: display number of images in batch
-        log.info(f"Auto-save: job has {len(job.results)} images")
-        
-        # Base folder configured by user
-        base_folder = Path(settings.auto_save_folder)
-        base_folder.mkdir(parents=True, exist_ok=True)
-        
-        # Krita filename (without extension)
+
+        # Compute the document folder unless the caller already did (bulk save)
+        if doc_folder is None:
+            doc_folder = self._doc_folder()
+
+        # Queue the images for the background writer and return immediately -
+        # this is called from the job-finished path which runs on the UI thread
+        image_type = self._get_image_type(job)
+        type_folder = doc_folder / image_type
+        self._ensure_folder(type_folder)
+        folder_str = os.fspath(type_folder) + os.sep
+        count = len(job.results)
+        prefix = _filename_prefix(job)
+        base_json = _job_metadata_json(job, image_type)
+        codec, quality = _codec()
+        for i, img in enumerate(job.results):
+            _worker.put(img, i, count, folder_str, image_type, prefix, base_json, codec, quality)
+        log.info("Auto-save: queued %d images to %s", count, folder_str)
+        return count
+
+    def save_job_images_dedup(self, job: Job) -> int:
+        """
+        Saves a job's batch with content-addressed deduplication
+        A marker under .index/<digest> lists the files written for this
+        content. On a hit the existing files are hard-linked (copied when the
+        filesystem refuses links) to the names this save would use, so the
+        batch still materializes on disk. The marker is only recorded once
+        every write has been confirmed, so a failed save is retried later.
+        """
+        if not settings.auto_save_generated or not job.results:
+            return 0
+
+        ctx = self._make_ctx()
+        image_type = self._get_image_type(job)
+        type_folder = ctx.doc_folder / image_type
+        self._ensure_folder(type_folder)
+        folder_str = os.fspath(type_folder) + os.sep
+        prefix = _filename_prefix(job)
+        codec, quality = _codec()
+        count = len(job.results)
+        paths = [f"{folder_str}{prefix}_{image_type}_{i:03d}.{codec}" for i in range(count)]
+
+        index_dir = ctx.base / ".index"
+        marker = index_dir / _batch_digest(job)
+        if marker.exists():
+            try:
+                sources = marker.read_text(encoding='utf-8').splitlines()
+            except OSError:
+                sources = []
+            if len(sources) == count and all(os.path.exists(s) for s in sources):
+                for src, dst in zip(sources, paths):
+                    try:
+                        os.link(src, dst)
+                    except OSError:
+                        shutil.copy2(src, dst)
+                    # Non-PNG saves keep their metadata in a .json sidecar -
+                    # carry it along with the image
+                    src_meta = os.path.splitext(src)[0] + ".json"
+                    if os.path.exists(src_meta):
+                        dst_meta = os.path.splitext(dst)[0] + ".json"
+                        try:
+                            os.link(src_meta, dst_meta)
+                        except OSError:
+                            shutil.copy2(src_meta, dst_meta)
+                log.info("Auto-save: linked %d previously saved images to %s", count, folder_str)
+                return count
+            # Stale marker - the recorded files are gone, save again below
+
+        base_json = _job_metadata_json(job, image_type)
+        futures = [
+            _SAVE_POOL.submit(_save_one, img, i, count, folder_str, image_type, prefix, base_json, codec, quality)
+            for i, img in enumerate(job.results)
+        ]
+
+        # Record the marker from the last completion callback, and only when
+        # every image actually hit the disk
+        pending = {"left": count, "saved": 0}
+        lock = threading.Lock()
+
+        def _on_done(future):
+            with lock:
+                pending["saved"] += future.result()
+                pending["left"] -= 1
+                complete = pending["left"] == 0
+            if complete and pending["saved"] == count:
+                try:
+                    index_dir.mkdir(parents=True, exist_ok=True)
+                    marker.write_text("\n".join(paths), encoding='utf-8')
+                except OSError:
+                    pass
+
+        for future in futures:
+            future.add_done_callback(_on_done)
+        log.info("Auto-save: queued %d images to %s", count, folder_str)
+        return count
+
+    def _make_ctx(self) -> _SaveCtx:
+        """Reads the settings and document name once into an immutable context"""
         doc_filename = self._model.document.filename
-        if doc_filename:
-            doc_name = Path(doc_filename).stem
-        else:
-            doc_name = "unsaved_document"
-        
-        # Create subfolder for this Krita file
-        doc_folder = base_folder / doc_name
-        doc_folder.mkdir(exist_ok=True)
-        
+        doc_stem = Path(doc_filename).stem if doc_filename else "unsaved_document"
+        return _SaveCtx(
+            base=Path(settings.auto_save_folder),
+            doc_stem=doc_stem,
+            enabled=settings.auto_save_generated,
+        )
+
+    def _doc_folder(self) -> Path:
+        """Resolves the per-document save folder (created lazily with the leaf)"""
+        return self._make_ctx().doc_folder
+
+    def _ensure_folder(self, type_folder: Path):
+        """Creates the whole folder chain with a single mkdir, memoized per session"""
+        if type_folder not in self._created_folders:
+            type_folder.mkdir(parents=True, exist_ok=True)
+            self._created_folders.add(type_folder)
+
+    def _submit_job_images(self, job: Job, doc_folder: Path) -> list:
+        """Submits all images of a job to the shared pool, returns the futures"""
         # Determine image type based on job type
         image_type = self._get_image_type(job)
-        
-        # Create subfolder for image type
+
+        # Create subfolder for image type (one syscall covers the whole chain)
         type_folder = doc_folder / image_type
-        type_folder.mkdir(exist_ok=True)
-        
+        self._ensure_folder(type_folder)
+
         # Debug: display job details
-        log.info(f"Auto-save: saving to {type_folder}, type={image_type}, job_kind={job.kind}, strength={getattr(job.params, 'strength', 'N/A')}")
-        
-        saved_count = 0
-        for i, img in enumerate(job.results):
-            try:
-                # Filename: prompt, date, index, etc.
-                prompt = getattr(job.params, 'name', 'image')
-                prompt = str(prompt).replace(' ', '_')[:50]
-                
-                # Unique timestamp for each image (include milliseconds)
-                timestamp = datetime.now().strftime('%Y%m%d-%H%M%S-%f')[:-3]  # Include milliseconds
-                
-                # Add type to filename
-                filename = f"{prompt}_{timestamp}_{image_type}_{i}.png"
-                path = type_folder / filename
-                
-                # Debug: display each saved image
-                log.info(f"Auto-save: saving image {i+1}/{len(job.results)} to {path}")
-                
-                # Prepare all metadata in a dictionary
-                all_metadata = MetadataFormatter.prepare_for_save(job, i, image_type)
-                
-                # Create JSON metadata
-                metadata_json = json.dumps(all_metadata, ensure_ascii=False, separators=(',', ':'))
-                
-                # Limit total JSON size (max 4KB)
-                if len(metadata_json) > 4000:
-                    # Truncate keeping essential metadata
-                    essential_metadata = {
-                        "prompt": all_metadata.get("prompt", ""),
-                        "seed": all_metadata.get("seed", 0),
-                        "strength": all_metadata.get("strength", 1.0),
-                        "generation_type": all_metadata.get("generation_type", ""),
-                        "timestamp": all_metadata.get("timestamp", ""),
-                        "truncated": True
-                    }
-                    metadata_json = json.dumps(essential_metadata, ensure_ascii=False, separators=(',', ':'))
-                
-                # Create metadata dictionary for QImageWriter
-                metadata = {"metadata": metadata_json}
-                
-                # Save with metadata
-                img.save(str(path), metadata=metadata)
-                log.info(f"Auto-save: successfully saved {path} with JSON metadata ({len(metadata_json)} chars)")
-                saved_count += 1
-                
-            except Exception as e:
-                log.warning(f"Auto-save failed for {path}: {e}")
-        
-        return saved_count
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("Auto-save: saving to %s, type=%s, job_kind=%s", type_folder, image_type, job.kind)
+
+        # Encode and write all images of the batch in parallel
+        folder_str = os.fspath(type_folder) + os.sep
+        count = len(job.results)
+        prefix = _filename_prefix(job)
+        base_json = _job_metadata_json(job, image_type)
+        codec, quality = _codec()
+        return [
+            _SAVE_POOL.submit(_save_one, img, i, count, folder_str, image_type, prefix, base_json, codec, quality)
+            for i, img in enumerate(job.results)
+        ]
     
     def _get_image_type(self, job: Job) -> str:
         """Determines image type based on job"""
         return ImageTypeDetector.get_image_type(job)
     
+    def count_history_eligible(self) -> int:
+        """
+        Counts the images a history save would write, without any file I/O
+        Cheap enough to call from the settings interface
+        """
+        return sum(
+            len(job.results)
+            for job in self._model.jobs._entries
+            if job.results and job.kind in _ELIGIBLE_KINDS
+        )
+
     def save_all_history_images(self) -> int:
         """
         Saves all images from current history
         Returns total number of saved images
         """
-        if not settings.auto_save_generated:
+        # Resolve settings and the document folder once for the whole traversal
+        ctx = self._make_ctx()
+        if not ctx.enabled:
             return 0
-        
-        # Base folder configured by user
-        base_folder = Path(settings.auto_save_folder)
-        base_folder.mkdir(parents=True, exist_ok=True)
-        
-        # Krita filename (without extension)
-        doc_filename = self._model.document.filename
-        if doc_filename:
-            doc_name = Path(doc_filename).stem
-        else:
-            doc_name = "unsaved_document"
-        
-        # Create subfolder for this Krita file
-        doc_folder = base_folder / doc_name
-        doc_folder.mkdir(exist_ok=True)
-        
+        doc_folder = ctx.doc_folder
+
+        # Stream the eligible jobs and drain each job's futures before moving
+        # on - peak memory stays bounded by one batch instead of growing with
+        # the history size (encoded images are held until their future resolves)
+        candidates = (
+            job for job in self._model.jobs._entries
+            if job.results and job.kind in _ELIGIBLE_KINDS
+        )
         total_saved = 0
-        
-        # Process all finished jobs
-        for job in self._model.jobs._entries:
-            if job.results and job.kind in [JobKind.diffusion, JobKind.animation, JobKind.upscaling]:
-                try:
-                    saved_count = self.save_job_images(job)
-                    total_saved += saved_count
-                    log.info(f"Auto-save: saved {saved_count} images from job {job.id}")
-                except Exception as e:
-                    log.warning(f"Auto-save: failed to save job {job.id}: {e}")
-        
-        log.info(f"Auto-save: total images saved from history: {total_saved}")
+        for job in candidates:
+            try:
+                futures = self._submit_job_images(job, doc_folder)
+            except Exception as e:
+                log.warning(f"Auto-save: failed to save job {job.id}: {e}")
+                continue
+            total_saved += sum(f.result() for f in futures)
+        log.info("Auto-save: total images saved from history: %d", total_saved)
         return total_saved
 
 
@@ -3,26 +3,37 @@ Configuration des fonctionnalités personnalisées
 Gestion des versions, paramètres et compatibilité
 """
 
-from dataclasses import dataclass
+import os
+
+from dataclasses import dataclass, field
 from typing import Dict, Any, List
 from pathlib import Path
 
 
-@dataclass
+def _read_config(file_path: str) -> Dict[str, Any]:
+    """Lit et parse un fichier de configuration JSON
+    Toujours lu frais : un import utilisateur doit voir le contenu actuel du
+    fichier ; le chargement unique de la config par défaut est déjà couvert
+    par le drapeau _loaded"""
+    try:
+        import orjson
+        with open(file_path, 'rb') as f:
+            return orjson.loads(f.read())
+    except ImportError:
+        import json
+        with open(file_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+
+@dataclass(slots=True)
 class CustomFeatureConfig:
     """Configuration d'une fonctionnalité personnalisée"""
     name: str
     version: str
     description: str
     enabled: bool = True
-    dependencies: List[str] = None
-    settings: Dict[str, Any] = None
-    
-    def __post_init__(self):
-        if self.dependencies is None:
-            self.dependencies = []
-        if self.settings is None:
-            self.settings = {}
+    dependencies: List[str] = field(default_factory=list)
+    settings: Dict[str, Any] = field(default_factory=dict)
 
 
 class CustomFeaturesConfig:
@@ -58,19 +69,23 @@ class CustomFeaturesConfig:
                     "folder": "generated_images",
                     "organize_by_type": True,
                     "include_metadata": True,
-                    "max_metadata_size": 4000
+                    "max_metadata_size": 4000,
+                    "codec": "png",  # "png" ou "webp" - webp encode bien plus vite en masse
+                    "quality": 85
                 }
             )
         }
-    
+        # Index des fonctionnalités activées - appartenance en O(1) pour les
+        # chemins UI qui interrogent l'activation à chaque redessin
+        self._enabled_names = {name for name, f in self.features.items() if f.enabled}
+
     def get_feature(self, feature_name: str) -> CustomFeatureConfig:
         """Retourne la configuration d'une fonctionnalité"""
         return self.features.get(feature_name)
     
     def is_feature_enabled(self, feature_name: str) -> bool:
         """Vérifie si une fonctionnalité est activée"""
-        feature = self.get_feature(feature_name)
-        return feature.enabled if feature else False
+        return feature_name in self._enabled_names
     
     def get_feature_setting(self, feature_name: str, setting_name: str, default=None):
         """Retourne un paramètre d'une fonctionnalité"""
@@ -90,16 +105,18 @@ class CustomFeaturesConfig:
         feature = self.get_feature(feature_name)
         if feature:
             feature.enabled = True
-    
+            self._enabled_names.add(feature_name)
+
     def disable_feature(self, feature_name: str):
         """Désactive une fonctionnalité"""
         feature = self.get_feature(feature_name)
         if feature:
             feature.enabled = False
-    
+            self._enabled_names.discard(feature_name)
+
     def get_enabled_features(self) -> List[str]:
         """Retourne la liste des fonctionnalités activées"""
-        return [name for name, feature in self.features.items() if feature.enabled]
+        return list(self._enabled_names)
     
     def get_all_features(self) -> Dict[str, CustomFeatureConfig]:
         """Retourne toutes les fonctionnalités"""
@@ -108,11 +125,16 @@ class CustomFeaturesConfig:
     def add_feature(self, feature_name: str, config: CustomFeatureConfig):
         """Ajoute une nouvelle fonctionnalité"""
         self.features[feature_name] = config
-    
+        if config.enabled:
+            self._enabled_names.add(feature_name)
+        else:
+            self._enabled_names.discard(feature_name)
+
     def remove_feature(self, feature_name: str):
         """Supprime une fonctionnalité"""
         if feature_name in self.features:
             del self.features[feature_name]
+            self._enabled_names.discard(feature_name)
     
     def check_compatibility(self, base_version: str) -> Dict[str, bool]:
         """
@@ -152,15 +174,22 @@ class CustomFeaturesConfig:
                 "settings": feature.settings
             }
         
-        with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(config_data, f, indent=2, ensure_ascii=False)
-    
+        # orjson sérialise nettement plus vite quand il est disponible
+        try:
+            import orjson
+            data = orjson.dumps(config_data, option=orjson.OPT_INDENT_2)
+        except ImportError:
+            data = json.dumps(config_data, indent=2, ensure_ascii=False).encode('utf-8')
+
+        # Écriture atomique : un seul gros write puis os.replace - évite les
+        # fichiers tronqués en cas de crash au milieu de la sauvegarde
+        tmp = file_path.with_suffix('.json.tmp')
+        tmp.write_bytes(data)
+        os.replace(tmp, file_path)
+
     def import_config(self, file_path: Path):
         """Importe la configuration depuis un fichier JSON"""
-        import json
-        
-        with open(file_path, 'r', encoding='utf-8') as f:
-            config_data = json.load(f)
+        config_data = _read_config(str(file_path))
         
         # Mettre à jour la version et les informations générales
         if "version" in config_data:
@@ -183,6 +212,9 @@ class CustomFeaturesConfig:
                 )
                 self.features[name] = config
 
+            # Resynchroniser l'index d'activation après l'import
+            self._enabled_names = {n for n, f in self.features.items() if f.enabled}
+
 
 # Instance globale de configuration
 custom_config = CustomFeaturesConfig()
@@ -190,6 +222,7 @@ custom_config = CustomFeaturesConfig()
 
 def get_config() -> CustomFeaturesConfig:
     """Retourne l'instance globale de configuration"""
+    _ensure_loaded()
     return custom_config
 
 
@@ -207,9 +240,18 @@ def save_config_to_file(file_path: Path):
 # Configuration par défaut
 DEFAULT_CONFIG_FILE = Path(__file__).parent / "custom_config.json"
 
-# Charger la configuration par défaut si elle existe
-if DEFAULT_CONFIG_FILE.exists():
-    load_config_from_file(DEFAULT_CONFIG_FILE)
-else:
-    # Créer le fichier de configuration par défaut
-    save_config_to_file(DEFAULT_CONFIG_FILE) 
\ No newline at end of file
+# Chargée paresseusement au premier accès - éviter les E/S disque à l'import
+_loaded = False
+
+
+def _ensure_loaded():
+    """Charge (ou crée) la configuration par défaut au premier accès réel"""
+    global _loaded
+    if _loaded:
+        return
+    _loaded = True
+    if DEFAULT_CONFIG_FILE.exists():
+        load_config_from_file(DEFAULT_CONFIG_FILE)
+    else:
+        # Créer le fichier de configuration par défaut
+        save_config_to_file(DEFAULT_CONFIG_FILE)
\ No newline at end of file
@@ -4,26 +4,109 @@ Script d'installation pour les fonctionnalités personnalisées
 Automatise l'intégration des fonctionnalités dans le code de base
 """
 
+import ast
+import hashlib
 import os
+import re
 import shutil
 import sys
 from pathlib import Path
 from typing import List, Tuple
 
+# Fin d'une méthode : prochaine méthode soeur ou retour au niveau module
+_METHOD_END_RE = re.compile(rb'\n(?=    def |    @|\S)')
+
+# Lignes ancres pour l'insertion des imports - compilées une fois au chargement
+_SETTINGS_ANCHOR = re.compile(rb'^from \.settings import settings$', re.M)
+_WIDGETS_ANCHOR = re.compile(rb'^from \.settings_widgets import', re.M)
+
+# Retouches de generation.py au niveau des instructions, en une seule
+# alternation : le tampon n'est parcouru qu'une fois au lieu d'une passe
+# par motif (les opérations structurelles passent par l'AST)
+_GENERATION_STMT_RE = re.compile(
+    r'(?P<instantiation>self\.metadata_widget = MetadataWidget\(self\))'
+    r'|(?P<indent>^[ \t]*)(?P<generate_button>self\.update_generate_button\(\))',
+    re.M,
+)
+
+
+def _file_digest(path) -> str:
+    """Empreinte BLAKE2b d'un fichier, lu par blocs de 1 Mio"""
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        while True:
+            block = f.read(1024 * 1024)
+            if not block:
+                break
+            h.update(block)
+    return h.hexdigest()
+
+
+def _fast_copy(src, dst):
+    """
+    Copie un fichier via le chemin zéro-copie de la plateforme
+    (sendfile sous POSIX, CopyFile2 sous Windows), avec repli sur shutil
+    """
+    try:
+        if hasattr(os, 'sendfile'):
+            with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+                size = os.fstat(fsrc.fileno()).st_size
+                offset = 0
+                while offset < size:
+                    sent = os.sendfile(fdst.fileno(), fsrc.fileno(), offset, size - offset)
+                    if sent == 0:
+                        break
+                    offset += sent
+        elif sys.platform == 'win32':
+            import ctypes
+            if ctypes.windll.kernel32.CopyFile2(str(src), str(dst), None) != 0:
+                raise OSError("CopyFile2 failed")
+        else:
+            shutil.copyfile(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
+    # Préserver les métadonnées comme le faisait copy2
+    shutil.copystat(src, dst)
+
 
 class CustomFeaturesInstaller:
     """Installeur pour les fonctionnalités personnalisées"""
     
+    # Fichiers sources modifiés par l'installation
+    TARGET_FILES = [
+        "ui/generation.py",
+        "persistence.py",
+        "ui/settings.py"
+    ]
+
     def __init__(self, project_root: Path):
         self.project_root = project_root
         self.custom_features_dir = project_root / "custom_features"
         self.backup_dir = project_root / "backup_before_custom_features"
-        
+        self._install_stamp_path = project_root / ".custom_features_install.stamp"
+
+    def _install_key(self) -> str:
+        """Empreinte SHA-256 des fichiers cibles et de l'installeur lui-même"""
+        key = hashlib.sha256()
+        for file_path in self.TARGET_FILES:
+            path = self.project_root / file_path
+            if path.exists():
+                key.update(path.read_bytes())
+        key.update(Path(__file__).read_bytes())
+        return key.hexdigest()
+
     def install(self) -> bool:
         """Installe les fonctionnalités personnalisées"""
         print("🚀 Installation des fonctionnalités personnalisées...")
-        
+
         try:
+            # Réinstallation à l'identique : rien à faire si l'empreinte
+            # des fichiers cibles n'a pas bougé depuis la dernière passe
+            key = self._install_key()
+            if self._install_stamp_path.exists() and self._install_stamp_path.read_text() == key:
+                print("✅ Déjà installé, rien à faire")
+                return True
+
             # 1. Vérifier la structure
             if not self._check_structure():
                 return False
@@ -40,6 +123,9 @@ class CustomFeaturesInstaller:
             if not self._verify_installation():
                 return False
             
+            # Mémoriser l'empreinte post-installation pour les prochains runs
+            self._install_stamp_path.write_text(self._install_key())
+
             print("✅ Installation réussie !")
             print("📝 Consultez custom_features/README.md pour plus d'informations")
             return True
@@ -56,6 +142,8 @@ class CustomFeaturesInstaller:
             # Restaurer les fichiers de sauvegarde
             if self.backup_dir.exists():
                 self._restore_backup()
+                if self._install_stamp_path.exists():
+                    self._install_stamp_path.unlink()
                 print("✅ Désinstallation réussie !")
                 return True
             else:
@@ -66,26 +154,48 @@ class CustomFeaturesInstaller:
             print(f"❌ Erreur lors de la désinstallation : {e}")
             return False
     
+    @staticmethod
+    def _existing_names(folder: Path) -> set:
+        """Liste les noms d'un dossier en un seul appel scandir"""
+        try:
+            with os.scandir(folder) as it:
+                return {entry.name for entry in it}
+        except OSError:
+            return set()
+
+    @staticmethod
+    def _group_by_parent(file_paths: List[str]) -> dict:
+        """Regroupe des chemins relatifs par dossier parent"""
+        by_parent = {}
+        for file_path in file_paths:
+            parent, _, name = file_path.rpartition('/')
+            by_parent.setdefault(parent, []).append((file_path, name))
+        return by_parent
+
     def _check_structure(self) -> bool:
         """Vérifie la structure du projet"""
         print("📋 Vérification de la structure...")
-        
+
         required_files = [
             "ui/generation.py",
-            "persistence.py", 
+            "persistence.py",
             "ui/settings.py",
             "settings.py"
         ]
-        
-        for file_path in required_files:
-            if not (self.project_root / file_path).exists():
-                print(f"❌ Fichier manquant : {file_path}")
-                return False
-        
+
+        # Un scandir par dossier parent au lieu d'un stat par fichier -
+        # sensible sur les montages réseau Windows
+        for parent, entries in self._group_by_parent(required_files).items():
+            names = self._existing_names(self.project_root / parent if parent else self.project_root)
+            for file_path, name in entries:
+                if name not in names:
+                    print(f"❌ Fichier manquant : {file_path}")
+                    return False
+
         if not self.custom_features_dir.exists():
             print(f"❌ Dossier custom_features manquant")
             return False
-        
+
         print("✅ Structure vérifiée")
         return True
     
@@ -109,7 +219,10 @@ class CustomFeaturesInstaller:
                 src = self.project_root / file_path
                 dst = self.backup_dir / file_path
                 dst.parent.mkdir(parents=True, exist_ok=True)
-                shutil.copy2(src, dst)
+                _fast_copy(src, dst)
+                # Empreinte en side-car : permet à la restauration de sauter
+                # les fichiers qui n'ont pas changé depuis la sauvegarde
+                dst.with_suffix(dst.suffix + '.sha').write_text(_file_digest(src))
             
             print("✅ Sauvegarde créée")
             return True
@@ -135,82 +248,133 @@ class CustomFeaturesInstaller:
         print("✅ Modifications appliquées")
         return True
     
+    @staticmethod
+    def _apply_edits(content: bytes, edits: List[Tuple[int, int, bytes]]) -> bytes:
+        """
+        Applique les remplacements (début, fin, texte) de droite à gauche
+        sur un bytearray - une seule copie finale au lieu d'une par édition
+        """
+        if not edits:
+            return content
+        ba = bytearray(content)
+        for start, end, replacement in sorted(edits, reverse=True):
+            ba[start:end] = replacement
+        return bytes(ba)
+
+    @staticmethod
+    def _atomic_write(file_path: Path, content: bytes):
+        """Écrit via un fichier temporaire puis os.replace - jamais de fichier déchiré"""
+        tmp = file_path.with_suffix(file_path.suffix + ".tmp")
+        with open(tmp, 'wb') as f:
+            f.write(content)
+        os.replace(tmp, file_path)
+
+    @staticmethod
+    def _insert_after(edits: List[Tuple[int, int, bytes]], content: bytes, anchor_re, block: bytes):
+        """Ajoute une édition insérant block juste après la ligne ancre"""
+        m = anchor_re.search(content)
+        if m:
+            edits.append((m.end(), m.end(), block))
+
+    @staticmethod
+    def _find_method_end(content: bytes, start: int) -> int:
+        """Cherche la fin de la méthode commençant à start (prochaine méthode ou dédentation)"""
+        m = _METHOD_END_RE.search(content, start)
+        return m.start() + 1 if m else len(content)
+
     def _modify_generation_py(self) -> bool:
         """Modifie ui/generation.py pour intégrer le panneau de métadonnées"""
         file_path = self.project_root / "ui/generation.py"
-        
+
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
+            # Une seule lecture, un seul parse AST, une seule écriture
+            with open(file_path, 'rb') as f:
                 content = f.read()
-            
-            # Remplacer l'import de MetadataWidget
-            if "class MetadataWidget(QWidget):" in content:
-                # Supprimer la classe MetadataWidget existante
-                start = content.find("class MetadataWidget(QWidget):")
-                end = content.find("\n\n", start)
-                if end == -1:
-                    end = len(content)
-                
-                content = content[:start] + content[end:]
-                
-                # Ajouter l'import personnalisé
-                import_line = "from ..custom_features import MetadataPanel\n"
-                content = content.replace(
-                    "from ..ui.theme import theme",
-                    "from ..ui.theme import theme\n" + import_line
-                )
-                
-                # Remplacer l'instanciation
-                content = content.replace(
-                    "self.metadata_widget = MetadataWidget(self)",
-                    "self.metadata_widget = MetadataPanel(self)"
-                )
-                
-                # Ajouter la connexion du paramètre de visibilité
-                visibility_code = '''
-        # Connecter le paramètre pour afficher/masquer l'interface des métadonnées
-        from ..settings import settings
-        self._metadata_visibility_connection = settings.changed.connect(self._update_metadata_visibility)
-        self._update_metadata_visibility()
-'''
-                
-                if "self._update_metadata_visibility()" not in content:
-                    # Trouver où ajouter le code
-                    insert_pos = content.find("self.update_generate_button()")
-                    if insert_pos != -1:
-                        content = content[:insert_pos] + visibility_code + content[insert_pos:]
-                
-                # Ajouter la méthode _update_metadata_visibility
-                if "_update_metadata_visibility" not in content:
+            text = content.decode('utf-8')
+
+            new_text = text
+            if "class MetadataWidget(QWidget):" in text:
+                # Localiser les noeuds structurels par un vrai parse plutôt
+                # que par des motifs textuels fragiles
+                tree = ast.parse(text)
+                meta_cls = gen_cls = theme_import = None
+                for node in tree.body:
+                    if isinstance(node, ast.ClassDef):
+                        if node.name == "MetadataWidget":
+                            meta_cls = node
+                        elif node.name == "GenerationWidget":
+                            gen_cls = node
+                    elif isinstance(node, ast.ImportFrom) and node.module == "ui.theme":
+                        theme_import = node
+
+                lines = text.splitlines(keepends=True)
+                removals = set()
+                inserts: dict = {}
+                if meta_cls is not None:
+                    # Supprimer la classe MetadataWidget existante
+                    removals.update(range(meta_cls.lineno - 1, meta_cls.end_lineno))
+                if theme_import is not None:
+                    # Ajouter l'import personnalisé après la ligne ancre
+                    inserts.setdefault(theme_import.end_lineno, []).append(
+                        "from ..custom_features import MetadataPanel\n")
+                if gen_cls is not None and "def _update_metadata_visibility" not in text:
+                    # Ajouter la méthode à la fin de la classe GenerationWidget
                     method_code = '''
-    def _update_metadata_visibility(self):
-        """Met à jour la visibilité de l'interface des métadonnées selon le paramètre"""
+    def _update_metadata_visibility(self, key=None, value=None):
+        """Met a jour la visibilite de l'interface des metadonnees selon le parametre"""
+        if key is not None and key != 'show_metadata_interface':
+            return
         from ..settings import settings
-        self.metadata_widget.setVisible(settings.show_metadata_interface)
+        if self.metadata_widget.isVisible() != settings.show_metadata_interface:
+            self.metadata_widget.setVisible(settings.show_metadata_interface)
 '''
-                    
-                    # Ajouter à la fin de la classe GenerationWidget
-                    class_end = content.rfind("class GenerationWidget")
-                    if class_end != -1:
-                        # Trouver la fin de la classe
-                        brace_count = 0
-                        pos = class_end
-                        while pos < len(content):
-                            if content[pos] == '{':
-                                brace_count += 1
-                            elif content[pos] == '}':
-                                brace_count -= 1
-                                if brace_count == 0:
-                                    content = content[:pos] + method_code + content[pos:]
-                                    break
-                            pos += 1
-            
-            with open(file_path, 'w', encoding='utf-8') as f:
-                f.write(content)
-            
+                    inserts.setdefault(gen_cls.end_lineno, []).append(method_code)
+
+                new_lines = []
+                for idx, line in enumerate(lines):
+                    if idx in inserts:
+                        new_lines.extend(inserts.pop(idx))
+                    if idx not in removals:
+                        new_lines.append(line)
+                for idx in sorted(inserts):
+                    new_lines.extend(inserts[idx])
+                new_text = ''.join(new_lines)
+
+                # Retouches au niveau des instructions, en une seule passe
+                has_visibility = "self._update_metadata_visibility()" in text
+                visibility_lines = (
+                    "# Connecter le parametre pour afficher/masquer l'interface des metadonnees",
+                    "from ..settings import settings",
+                    "self._metadata_visibility_connection = settings.changed.connect(self._update_metadata_visibility)",
+                    "self._update_metadata_visibility()",
+                )
+                state = {"button_patched": False}
+
+                def dispatch(m):
+                    if m.group("instantiation"):
+                        return "self.metadata_widget = MetadataPanel(self)"
+                    if not has_visibility and not state["button_patched"]:
+                        # Connexion de la visibilité avant le premier appel,
+                        # réindentée sur l'instruction qu'elle précède
+                        state["button_patched"] = True
+                        indent = m.group("indent")
+                        code = ''.join(f"{indent}{line}\n" for line in visibility_lines)
+                        return code + m.group(0)
+                    return m.group(0)
+
+                new_text = _GENERATION_STMT_RE.sub(dispatch, new_text)
+
+            # Ne pas toucher au fichier si rien n'a changé (mtime, caches .pyc)
+            if new_text != text:
+                # Valider la syntaxe avant d'écraser le fichier - la
+                # vérification par find_spec ne détecte pas une réécriture
+                # qui produirait du code mal indenté
+                ast.parse(new_text)
+                self._atomic_write(file_path, new_text.encode('utf-8'))
+
             print("✅ ui/generation.py modifié")
             return True
-            
+
         except Exception as e:
             print(f"❌ Erreur lors de la modification de generation.py : {e}")
             return False
@@ -218,48 +382,36 @@ class CustomFeaturesInstaller:
     def _modify_persistence_py(self) -> bool:
         """Modifie persistence.py pour intégrer la sauvegarde automatique"""
         file_path = self.project_root / "persistence.py"
-        
+
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
+            with open(file_path, 'rb') as f:
                 content = f.read()
-            
-            # Ajouter l'import
-            import_line = "from .custom_features import auto_save_job_images\n"
-            content = content.replace(
-                "from .settings import settings",
-                "from .settings import settings\n" + import_line
-            )
-            
-            # Ajouter l'appel de sauvegarde automatique
-            if "auto_save_job_images" not in content:
-                # Trouver la méthode _save_results
-                method_start = content.find("def _save_results(self, job: Job):")
+
+            edits: List[Tuple[int, int, bytes]] = []
+
+            # Ajouter l'import et l'appel de sauvegarde automatique
+            if content.find(b"auto_save_job_images") == -1:
+                self._insert_after(edits, content, _SETTINGS_ANCHOR,
+                                   b"\nfrom .custom_features import auto_save_job_images\n")
+
+                # Trouver la fin de la méthode _save_results
+                method_start = content.find(b"def _save_results(self, job: Job):")
                 if method_start != -1:
-                    # Trouver la fin de la méthode
-                    brace_count = 0
-                    pos = method_start
-                    while pos < len(content):
-                        if content[pos] == '{':
-                            brace_count += 1
-                        elif content[pos] == '}':
-                            brace_count -= 1
-                            if brace_count == 0:
-                                # Ajouter l'appel avant la fin
-                                auto_save_code = '''
+                    pos = self._find_method_end(content, method_start)
+                    auto_save_code = b'''
             # Auto-save generated images if enabled
             if settings.auto_save_generated:
                 auto_save_job_images(self._model, job)
 '''
-                                content = content[:pos] + auto_save_code + content[pos:]
-                                break
-                        pos += 1
-            
-            with open(file_path, 'w', encoding='utf-8') as f:
-                f.write(content)
-            
+                    edits.append((pos, pos, auto_save_code))
+
+            new_content = self._apply_edits(content, edits)
+            if new_content != content:
+                self._atomic_write(file_path, new_content)
+
             print("✅ persistence.py modifié")
             return True
-            
+
         except Exception as e:
             print(f"❌ Erreur lors de la modification de persistence.py : {e}")
             return False
@@ -267,51 +419,42 @@ class CustomFeaturesInstaller:
     def _modify_settings_py(self) -> bool:
         """Modifie ui/settings.py pour ajouter les onglets personnalisés"""
         file_path = self.project_root / "ui/settings.py"
-        
+
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
+            with open(file_path, 'rb') as f:
                 content = f.read()
-            
-            # Ajouter l'import
-            import_line = "from ..custom_features import custom_integration\n"
-            content = content.replace(
-                "from .settings_widgets import",
-                "from .settings_widgets import\n" + import_line
-            )
-            
-            # Ajouter les onglets dans SettingsDialog.__init__
-            if "custom_integration" not in content:
+
+            edits: List[Tuple[int, int, bytes]] = []
+
+            # Ajouter l'import et les onglets dans SettingsDialog.__init__
+            if content.find(b"custom_integration") == -1:
+                # Insérer avant la ligne d'import (potentiellement multilignes)
+                m = _WIDGETS_ANCHOR.search(content)
+                if m:
+                    edits.append((m.start(), m.start(),
+                                  b"from ..custom_features import custom_integration\n"))
+
                 # Trouver la fin de __init__
-                init_start = content.find("def __init__(self, server: Server):")
+                init_start = content.find(b"def __init__(self, server: Server):")
                 if init_start != -1:
-                    # Trouver la fin de la méthode
-                    brace_count = 0
-                    pos = init_start
-                    while pos < len(content):
-                        if content[pos] == '{':
-                            brace_count += 1
-                        elif content[pos] == '}':
-                            brace_count -= 1
-                            if brace_count == 0:
-                                # Ajouter les onglets avant la fin
-                                tabs_code = '''
+                    pos = self._find_method_end(content, init_start)
+                    tabs_code = '''
         # Ajouter les onglets personnalisés
         auto_save_widget = custom_integration.get_auto_save_settings_widget()
         self.add_tab("Sauvegarde automatique", auto_save_widget)
-        
+
         metadata_widget = custom_integration.get_metadata_settings_widget()
         self.add_tab("Métadonnées", metadata_widget)
-'''
-                                content = content[:pos] + tabs_code + content[pos:]
-                                break
-                        pos += 1
-            
-            with open(file_path, 'w', encoding='utf-8') as f:
-                f.write(content)
-            
+'''.encode('utf-8')
+                    edits.append((pos, pos, tabs_code))
+
+            new_content = self._apply_edits(content, edits)
+            if new_content != content:
+                self._atomic_write(file_path, new_content)
+
             print("✅ ui/settings.py modifié")
             return True
-            
+
         except Exception as e:
             print(f"❌ Erreur lors de la modification de settings.py : {e}")
             return False
@@ -319,16 +462,32 @@ class CustomFeaturesInstaller:
     def _verify_installation(self) -> bool:
         """Vérifie que l'installation s'est bien passée"""
         print("🔍 Vérification de l'installation...")
-        
-        # Vérifier que les imports fonctionnent
+
+        import importlib.util
+
+        # find_spec localise les modules sans les exécuter - pas besoin de
+        # charger PyQt5 juste pour vérifier que les fichiers sont en place
+        root_str = str(self.project_root)
+        sys.path.insert(0, root_str)
         try:
-            sys.path.insert(0, str(self.project_root))
-            from custom_features import MetadataPanel, AutoSaveManager, custom_integration
+            required_modules = [
+                "custom_features",
+                "custom_features.metadata_panel",
+                "custom_features.auto_save",
+                "custom_features.integration",
+            ]
+            for module_name in required_modules:
+                if importlib.util.find_spec(module_name) is None:
+                    print(f"❌ Module introuvable : {module_name}")
+                    return False
             print("✅ Imports des fonctionnalités personnalisées OK")
             return True
         except ImportError as e:
             print(f"❌ Erreur d'import : {e}")
             return False
+        finally:
+            # Ne pas laisser traîner l'entrée dans sys.path
+            sys.path.remove(root_str)
     
     def _restore_backup(self) -> bool:
         """Restaure les fichiers de sauvegarde"""
@@ -338,12 +497,21 @@ class CustomFeaturesInstaller:
                 "persistence.py",
                 "ui/settings.py"
             ]
-            
-            for file_path in files_to_restore:
-                src = self.backup_dir / file_path
-                dst = self.project_root / file_path
-                if src.exists():
-                    shutil.copy2(src, dst)
+
+            # Même optimisation que _check_structure : un scandir par parent
+            for parent, entries in self._group_by_parent(files_to_restore).items():
+                names = self._existing_names(self.backup_dir / parent if parent else self.backup_dir)
+                for file_path, name in entries:
+                    if name not in names:
+                        continue
+                    src = self.backup_dir / file_path
+                    dst = self.project_root / file_path
+                    # Sauter la copie si le fichier vivant est déjà identique
+                    sha_file = src.with_suffix(src.suffix + '.sha')
+                    if sha_file.exists() and dst.exists():
+                        if _file_digest(dst) == sha_file.read_text():
+                            continue
+                    _fast_copy(src, dst)
             
             # Supprimer la sauvegarde
             shutil.rmtree(self.backup_dir)
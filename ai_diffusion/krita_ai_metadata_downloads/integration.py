@@ -6,9 +6,11 @@ Connects custom features to base code in a modular way
 from typing import Optional, Callable
 from PyQt5.QtWidgets import QWidget
 
-from .metadata_panel import MetadataPanel
-from .auto_save import AutoSaveManager, auto_save_job_images
-from .settings_extensions import AutoSaveSettingsWidget, MetadataSettingsWidget
+from ..util import client_logger as log
+
+# The feature modules (panel, auto-save, settings widgets) are imported
+# lazily in the methods below, so loading the plugin does not pull them in
+# for users who never open the corresponding UI
 
 
 class CustomFeaturesIntegration:
@@ -16,38 +18,45 @@ class CustomFeaturesIntegration:
     Integration class to manage the addition of custom features
     Allows easy activation/deactivation of features
     """
-    
+
     def __init__(self):
-        self._metadata_panel: Optional[MetadataPanel] = None
-        self._auto_save_manager: Optional[AutoSaveManager] = None
-        self._integration_hooks = {}
-    
-    def setup_metadata_panel(self, parent_widget: QWidget) -> MetadataPanel:
+        self._metadata_panel: Optional['MetadataPanel'] = None
+        self._auto_save_manager: Optional['AutoSaveManager'] = None
+        # Hooks as plain attributes - called once per generated image, and an
+        # attribute load is cheaper than the dict membership test + lookup
+        self._auto_save_hook: Optional[Callable] = None
+        self._metadata_hook: Optional[Callable] = None
+
+    def setup_metadata_panel(self, parent_widget: QWidget) -> 'MetadataPanel':
         """
         Configure and return the metadata panel
         To be called from the main generation widget
         """
         if not self._metadata_panel:
+            from .metadata_panel import MetadataPanel
             self._metadata_panel = MetadataPanel(parent_widget)
-        
+
         return self._metadata_panel
-    
-    def setup_auto_save(self, model) -> AutoSaveManager:
+
+    def setup_auto_save(self, model) -> 'AutoSaveManager':
         """
         Configure and return the automatic save manager
         To be called during model initialization
         """
         if not self._auto_save_manager:
+            from .auto_save import AutoSaveManager
             self._auto_save_manager = AutoSaveManager(model)
-        
+
         return self._auto_save_manager
-    
-    def get_auto_save_settings_widget(self, parent=None) -> AutoSaveSettingsWidget:
+
+    def get_auto_save_settings_widget(self, parent=None) -> 'AutoSaveSettingsWidget':
         """Returns the automatic save settings widget (legacy)"""
+        from .settings_extensions import AutoSaveSettingsWidget
         return AutoSaveSettingsWidget(parent)
-    
-    def get_metadata_settings_widget(self, parent=None) -> MetadataSettingsWidget:
+
+    def get_metadata_settings_widget(self, parent=None) -> 'MetadataSettingsWidget':
         """Returns the metadata display settings widget (legacy)"""
+        from .settings_extensions import MetadataSettingsWidget
         return MetadataSettingsWidget(parent)
     
     def get_metadata_downloads_widget(self, parent=None) -> 'MetadataDownloadsWidget':
@@ -60,31 +69,31 @@ class CustomFeaturesIntegration:
         Register a hook function for automatic saving
         This function will be called after each image generation
         """
-        self._integration_hooks['auto_save'] = hook_function
-    
+        self._auto_save_hook = hook_function
+
     def register_metadata_hook(self, hook_function: Callable):
         """
         Register a hook function for metadata display
         This function will be called when selecting images
         """
-        self._integration_hooks['metadata'] = hook_function
-    
+        self._metadata_hook = hook_function
+
     def call_auto_save_hook(self, model, job):
         """Calls the automatic save hook"""
-        if 'auto_save' in self._integration_hooks:
+        hook = self._auto_save_hook
+        if hook is not None:
             try:
-                self._integration_hooks['auto_save'](model, job)
+                hook(model, job)
             except Exception as e:
-                from ..util import client_logger as log
                 log.warning(f"Auto-save hook failed: {e}")
-    
+
     def call_metadata_hook(self, model, job):
         """Calls the metadata display hook"""
-        if 'metadata' in self._integration_hooks:
+        hook = self._metadata_hook
+        if hook is not None:
             try:
-                self._integration_hooks['metadata'](model, job)
+                hook(model, job)
             except Exception as e:
-                from ..util import client_logger as log
                 log.warning(f"Metadata hook failed: {e}")
     
     def cleanup(self):
@@ -94,7 +103,8 @@ class CustomFeaturesIntegration:
             self._metadata_panel = None
         
         self._auto_save_manager = None
-        self._integration_hooks.clear()
+        self._auto_save_hook = None
+        self._metadata_hook = None
 
 
 # Instance globale pour l'intégration
@@ -107,7 +117,7 @@ def integrate_with_generation_widget(generation_widget, model):
     into the main generation widget
     """
     from ..settings import settings
-    
+
     # Integrate metadata panel
     if settings.show_metadata_interface:
         metadata_panel = custom_integration.setup_metadata_panel(generation_widget)
@@ -122,8 +132,11 @@ def integrate_with_generation_widget(generation_widget, model):
     
     # Register automatic save hook
     def auto_save_hook(model, job):
+        # Content-addressed dedup lives in the manager: identical batches
+        # re-link the existing files instead of re-encoding them, and the
+        # dedup marker is only recorded after confirmed writes
         if settings.auto_save_generated and job.results:
-            auto_save_job_images(model, job)
+            auto_save_manager.save_job_images_dedup(job)
     
     custom_integration.register_auto_save_hook(auto_save_hook)
     
@@ -4,7 +4,7 @@ Combines metadata display and automatic download settings in a single tab
 """
 
 from PyQt5.QtWidgets import (
-    QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, 
+    QWidget, QVBoxLayout, QFormLayout, QPushButton,
     QMessageBox, QFrame, QGroupBox, QGridLayout
 )
 from PyQt5.QtCore import Qt
@@ -15,6 +15,33 @@ from ..root import root
 from .auto_save import auto_save_all_history_images
 from .utils import StyleManager
 
+# One shared stylesheet applied to the widget - Qt cascades it to the child
+# group boxes, so the QSS is parsed once instead of once per section
+_GROUPBOX_QSS = """
+    QGroupBox {
+        font-weight: bold;
+        border: 1px solid #555;
+        border-radius: 5px;
+        margin-top: 10px;
+        padding-top: 10px;
+    }
+    QGroupBox::title {
+        subcontrol-origin: margin;
+        left: 10px;
+        padding: 0 5px 0 5px;
+    }
+"""
+
+# Button-flag combination computed once instead of per dialog
+_QMB_YES_NO = QMessageBox.Yes | QMessageBox.No
+
+
+def _setting_widgets():
+    """Deferred import of the settings widget classes, resolved once per call
+    Keeps the heavy ui.settings_widgets module out of plugin cold-start"""
+    from ..ui.settings_widgets import SwitchSetting, SpinBoxSetting, LineEditSetting
+    return SwitchSetting, SpinBoxSetting, LineEditSetting
+
 
 class MetadataDownloadsWidget(QWidget):
     """
@@ -24,6 +51,8 @@ class MetadataDownloadsWidget(QWidget):
     
     def __init__(self, parent=None):
         super().__init__(parent)
+        # One QMessageBox reused across all dialogs - created on first use
+        self._msgbox = None
         self.setup_ui()
     
     def setup_ui(self):
@@ -31,7 +60,8 @@ class MetadataDownloadsWidget(QWidget):
         layout = QVBoxLayout(self)
         layout.setContentsMargins(10, 10, 10, 10)
         layout.setSpacing(15)
-        
+        self.setStyleSheet(_GROUPBOX_QSS)
+
         # Metadata Display Section
         metadata_group = self._create_metadata_section()
         layout.addWidget(metadata_group)
@@ -49,90 +79,49 @@ class MetadataDownloadsWidget(QWidget):
     def _create_metadata_section(self):
         """Create metadata display settings section"""
         group = QGroupBox(_("Metadata Display"))
-        group.setStyleSheet("""
-            QGroupBox {
-                font-weight: bold;
-                border: 1px solid #555;
-                border-radius: 5px;
-                margin-top: 10px;
-                padding-top: 10px;
-            }
-            QGroupBox::title {
-                subcontrol-origin: margin;
-                left: 10px;
-                padding: 0 5px 0 5px;
-            }
-        """)
-        
         layout = QVBoxLayout(group)
         layout.setSpacing(10)
         
+        SwitchSetting, SpinBoxSetting, _line_edit = _setting_widgets()
+
         # Enable metadata interface
-        from ..ui.settings_widgets import SwitchSetting
         self.show_metadata_interface = SwitchSetting(
             settings._show_metadata_interface, 
             self
         )
         layout.addWidget(self.show_metadata_interface)
         
-        # Font size setting
-        from ..ui.settings_widgets import SpinBoxSetting
-        font_layout = QHBoxLayout()
-        font_label = QLabel(_("Font Size:"))
-        font_label.setFixedWidth(80)
-        font_layout.addWidget(font_label)
-        
+        # Font size and widget height settings - QFormLayout handles the
+        # label/field rows natively, fewer widgets than manual QHBoxLayouts
+        form = QFormLayout()
         self.metadata_font_size = SpinBoxSetting(
-            settings._metadata_font_size, 
-            self, 
-            8, 
+            settings._metadata_font_size,
+            self,
+            8,
             20
         )
-        font_layout.addWidget(self.metadata_font_size)
-        font_layout.addStretch()
-        layout.addLayout(font_layout)
-        
-        # Widget height setting
-        height_layout = QHBoxLayout()
-        height_label = QLabel(_("Widget Height:"))
-        height_label.setFixedWidth(80)
-        height_layout.addWidget(height_label)
-        
+        form.addRow(_("Font Size:"), self.metadata_font_size)
+
         self.metadata_widget_height = SpinBoxSetting(
-            settings._metadata_widget_height, 
-            self, 
-            100, 
+            settings._metadata_widget_height,
+            self,
+            100,
             500
         )
-        height_layout.addWidget(self.metadata_widget_height)
-        height_layout.addStretch()
-        layout.addLayout(height_layout)
-        
+        form.addRow(_("Widget Height:"), self.metadata_widget_height)
+        layout.addLayout(form)
+
         return group
     
     def _create_downloads_section(self):
         """Create automatic downloads settings section"""
         group = QGroupBox(_("Automatic Downloads"))
-        group.setStyleSheet("""
-            QGroupBox {
-                font-weight: bold;
-                border: 1px solid #555;
-                border-radius: 5px;
-                margin-top: 10px;
-                padding-top: 10px;
-            }
-            QGroupBox::title {
-                subcontrol-origin: margin;
-                left: 10px;
-                padding: 0 5px 0 5px;
-            }
-        """)
-        
         layout = QVBoxLayout(group)
         layout.setSpacing(10)
         
+        SwitchSetting, _spin_box, LineEditSetting = _setting_widgets()
+
         # Enable automatic downloads
-        from ..ui.settings_widgets import SwitchSetting, LineEditSetting
         self.auto_save_switch = SwitchSetting(
             settings._auto_save_generated, 
             (_("Enabled"), _("Disabled")), 
@@ -141,39 +130,19 @@ class MetadataDownloadsWidget(QWidget):
         layout.addWidget(self.auto_save_switch)
         
         # Download folder setting
-        folder_layout = QHBoxLayout()
-        folder_label = QLabel(_("Download Folder:"))
-        folder_label.setFixedWidth(100)
-        folder_layout.addWidget(folder_label)
-        
+        form = QFormLayout()
         self.auto_save_folder = LineEditSetting(
-            settings._auto_save_folder, 
+            settings._auto_save_folder,
             self
         )
-        folder_layout.addWidget(self.auto_save_folder)
-        folder_layout.addStretch()
-        layout.addLayout(folder_layout)
-        
+        form.addRow(_("Download Folder:"), self.auto_save_folder)
+        layout.addLayout(form)
+
         return group
     
     def _create_actions_section(self):
         """Create action buttons section"""
         group = QGroupBox(_("Actions"))
-        group.setStyleSheet("""
-            QGroupBox {
-                font-weight: bold;
-                border: 1px solid #555;
-                border-radius: 5px;
-                margin-top: 10px;
-                padding-top: 10px;
-            }
-            QGroupBox::title {
-                subcontrol-origin: margin;
-                left: 10px;
-                padding: 0 5px 0 5px;
-            }
-        """)
-        
         layout = QVBoxLayout(group)
         layout.setSpacing(10)
         
@@ -191,42 +160,58 @@ class MetadataDownloadsWidget(QWidget):
         
         return group
     
+    def _show_message(self, icon, title, text, buttons=QMessageBox.Ok):
+        """Shows the shared message box, returns the clicked button
+        The static QMessageBox helpers build a new dialog per call - reusing
+        one instance avoids that allocation and keeps a single modal per action"""
+        if self._msgbox is None:
+            self._msgbox = QMessageBox(self)
+        box = self._msgbox
+        box.setIcon(icon)
+        box.setWindowTitle(title)
+        box.setText(text)
+        box.setStandardButtons(buttons)
+        return box.exec_()
+
     def _download_all_images(self):
         """Downloads all images from current history"""
         if not root.active_model:
-            QMessageBox.warning(self, _("Error"), _("No active model found"))
+            self._show_message(QMessageBox.Warning, _("Error"), _("No active model found"))
             return
-            
+
         if not settings.auto_save_folder:
-            QMessageBox.warning(self, _("Error"), _("Please configure a download folder first"))
+            self._show_message(QMessageBox.Warning, _("Error"), _("Please configure a download folder first"))
             return
-            
+
         try:
             count = auto_save_all_history_images(root.active_model)
-            QMessageBox.information(self, _("Success"), 
+            self._show_message(QMessageBox.Information, _("Success"),
                 _("{} images have been downloaded to the configured folder").format(count))
         except Exception as e:
-            QMessageBox.critical(self, _("Error"), 
+            self._show_message(QMessageBox.Critical, _("Error"),
                 _("Error during download: {}").format(str(e)))
-    
+
     def _reset_settings(self):
         """Reset settings to defaults"""
-        reply = QMessageBox.question(
-            self, 
-            _("Confirmation"), 
+        reply = self._show_message(
+            QMessageBox.Question,
+            _("Confirmation"),
             _("Are you sure you want to reset all metadata and download settings to defaults?"),
-            QMessageBox.Yes | QMessageBox.No
+            _QMB_YES_NO
         )
-        
+
         if reply == QMessageBox.Yes:
-            # Reset metadata settings
-            settings.show_metadata_interface = True
-            settings.metadata_font_size = 12
-            settings.metadata_widget_height = 280
-            
-            # Reset download settings
-            settings.auto_save_generated = False
-            settings.auto_save_folder = "generated_images"
-            
+            # Group the writes into a single change notification - each
+            # assignment would otherwise emit its own signal and repaint
+            with settings.batch_update():
+                # Reset metadata settings
+                settings.show_metadata_interface = True
+                settings.metadata_font_size = 12
+                settings.metadata_widget_height = 280
+
+                # Reset download settings
+                settings.auto_save_generated = False
+                settings.auto_save_folder = "generated_images"
+
             settings.save()
-            QMessageBox.information(self, _("Success"), _("Settings reset to defaults")) 
\ No newline at end of file
+            self._show_message(QMessageBox.Information, _("Success"), _("Settings reset to defaults"))
\ No newline at end of file
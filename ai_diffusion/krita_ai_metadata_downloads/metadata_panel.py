@@ -4,40 +4,115 @@ Custom feature to display and copy metadata from generated images
 """
 
 import json
-from pathlib import Path
-from datetime import datetime
+import struct
+import zlib
+from collections import OrderedDict
 from typing import Optional, Dict, Any
 
 from PyQt5.QtWidgets import (
-    QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, 
-    QTextEdit, QMenu, QAction, QDialog, QMessageBox, QFileDialog
+    QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
+    QPlainTextEdit, QMenu, QAction, QDialog, QFileDialog, QShortcut
 )
-from PyQt5.QtCore import Qt, QByteArray
-from PyQt5.QtGui import QGuiApplication, QPixmap, QImage, QImageReader
+from PyQt5.QtCore import Qt, QObject, QRunnable, QSize, QThreadPool, QTimer, pyqtSignal
+from PyQt5.QtGui import QGuiApplication, QKeySequence, QPixmap, QImage, QImageReader
 
-from ..ui.theme import theme
+from ..settings import settings
 from ..localization import _
-from ..model import Model, Job
 from ..root import root
 from .utils import MetadataFormatter, StyleManager
 
+# Translated once at import time - these strings are needed on every
+# selection change or context-menu open, and each _() call is a gettext lookup
+_MSG_SELECT = _("Select an image to see its metadata")
+_MSG_NOT_FOUND = _("Image not found")
+_MSG_COPY = _("Copy")
+_MSG_SELECT_ALL = _("Select All")
+
+_PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+# Cap what goes into the visible text widgets - embedded workflows can reach
+# hundreds of KB and stall the text document layout well before that
+_DISPLAY_CAP = 32_768
+
+
+def _read_png_text_chunks(path: str) -> Dict[str, str]:
+    """
+    Reads tEXt/zTXt/iTXt chunks straight from the PNG byte stream
+    Skips Qt's image plugin and its per-value QString conversions when only
+    the text metadata is needed - pure struct/bytes work
+    """
+    texts: Dict[str, str] = {}
+    with open(path, 'rb') as f:
+        if f.read(8) != _PNG_SIGNATURE:
+            return texts
+        while True:
+            header = f.read(8)
+            if len(header) < 8:
+                break
+            length, ctype = struct.unpack('>I4s', header)
+            if ctype == b'IEND':
+                break
+            if ctype not in (b'tEXt', b'zTXt', b'iTXt'):
+                f.seek(length + 4, 1)  # skip payload + CRC
+                continue
+            data = f.read(length)
+            f.seek(4, 1)  # skip CRC
+            try:
+                key, _sep, rest = data.partition(b'\x00')
+                if ctype == b'tEXt':
+                    value = rest.decode('latin-1')
+                elif ctype == b'zTXt':
+                    # First byte after the keyword is the compression method
+                    # The spec defines tEXt/zTXt text as Latin-1 (UTF-8 is iTXt only)
+                    value = zlib.decompress(rest[1:]).decode('latin-1')
+                else:  # iTXt: compression flag/method, language, translated key
+                    compressed = rest[:1] == b'\x01'
+                    _lang, _sep, rest = rest[2:].partition(b'\x00')
+                    _translated, _sep, payload = rest.partition(b'\x00')
+                    value = (zlib.decompress(payload) if compressed else payload).decode('utf-8')
+                texts[key.decode('latin-1')] = value
+            except (zlib.error, UnicodeDecodeError):
+                continue
+    return texts
+
+
+class MetadataTextEdit(QPlainTextEdit):
+    """Custom QPlainTextEdit for metadata display with quick copy
+    Plain-text layout stays responsive on long prompts where QTextEdit's
+    rich-text document engine degrades
+    Ctrl+C is wired through a QShortcut by the panel, so keystrokes are
+    dispatched in C++ without a Python round-trip per key"""
 
-class MetadataTextEdit(QTextEdit):
-    """Custom QTextEdit for metadata display with quick copy"""
-    
     def __init__(self, parent=None):
         super().__init__(parent)
         self.parent_widget = parent
-    
-    def keyPressEvent(self, event):
-        if event.key() == Qt.Key.Key_C and event.modifiers() == Qt.KeyboardModifier.ControlModifier:
-            text = self.textCursor().selectedText()
-            if text:
-                clipboard = QGuiApplication.clipboard()
-                clipboard.setText(text)
-            event.accept()
-            return
-        super().keyPressEvent(event)
+
+
+class _ImageLoadSignals(QObject):
+    # QImage crosses the thread boundary - QPixmap may only be created on
+    # the UI thread, so the receiving slot does the conversion
+    finished = pyqtSignal(dict, QImage)
+
+
+class _ImageLoadTask(QRunnable):
+    """Decodes an external image and extracts its metadata off the UI thread"""
+
+    def __init__(self, image_path: str, preview_width: int):
+        super().__init__()
+        self._image_path = image_path
+        self._preview_width = preview_width
+        self.signals = _ImageLoadSignals()
+
+    def run(self):
+        reader = QImageReader(self._image_path)
+        metadata = MetadataPanel._extract_image_metadata(reader)
+        # Let the codec decode straight to preview resolution - much cheaper
+        # than reading the full image and resampling afterwards
+        size = reader.size()
+        if size.isValid() and size.width() > self._preview_width:
+            scaled_height = round(size.height() * self._preview_width / size.width())
+            reader.setScaledSize(QSize(self._preview_width, scaled_height))
+        self.signals.finished.emit(metadata, reader.read())
 
 
 class MetadataPanel(QWidget):
@@ -50,9 +125,19 @@ class MetadataPanel(QWidget):
         super().__init__(parent)
         self._model = root.active_model
         self._model_bindings = []
+        # Formatted metadata per (job_id, image_index) - clicking back and
+        # forth through the gallery reuses the string instead of re-formatting
+        self._format_cache: OrderedDict = OrderedDict()
+
+        # Coalesce rapid selection changes - only the last selection within
+        # the interval actually renders, so clicking through thumbnails
+        # does not queue up a text rebuild per click
+        self._update_timer = QTimer(self)
+        self._update_timer.setSingleShot(True)
+        self._update_timer.setInterval(30)
+        self._update_timer.timeout.connect(self._do_update_metadata)
         
         # Load saved settings
-        from ..settings import settings
         self._font_size = settings.metadata_font_size
         self._widget_height = settings.metadata_widget_height
         self._text_height = self._widget_height - 10
@@ -70,11 +155,16 @@ class MetadataPanel(QWidget):
         self.setMaximumHeight(self._widget_height)
         self.setMinimumHeight(100)
         
+        # External-image preview dialog, built on first use and then reused -
+        # repeated inspections only swap the pixmap and the text
+        self._preview_dialog: Optional[QDialog] = None
+        self._full_metadata: Optional[str] = None
+
         self._setup_ui()
         self._setup_connections()
-        
+
         # Default message
-        self._metadata_text.setPlainText(_("Select an image to see its metadata"))
+        self._metadata_text.setPlainText(_MSG_SELECT)
     
     def _setup_ui(self):
         """Configure the user interface"""
@@ -82,6 +172,9 @@ class MetadataPanel(QWidget):
         layout.setContentsMargins(4, 4, 4, 4)
         layout.setSpacing(3)
         
+        # Resolve the shared button stylesheet once for all six buttons
+        btn_style = StyleManager.get_button_style()
+        
         # Toolbar for size controls
         toolbar_layout = QHBoxLayout()
         toolbar_layout.setSpacing(8)
@@ -94,13 +187,13 @@ class MetadataPanel(QWidget):
         # Buttons to adjust font size
         self._font_smaller_btn = QPushButton("A-", self)
         self._font_smaller_btn.setFixedSize(24, 20)
-        self._font_smaller_btn.setStyleSheet(StyleManager.get_button_style())
+        self._font_smaller_btn.setStyleSheet(btn_style)
         self._font_smaller_btn.clicked.connect(self._decrease_font_size)
         toolbar_layout.addWidget(self._font_smaller_btn)
         
         self._font_larger_btn = QPushButton("A+", self)
         self._font_larger_btn.setFixedSize(24, 20)
-        self._font_larger_btn.setStyleSheet(StyleManager.get_button_style())
+        self._font_larger_btn.setStyleSheet(btn_style)
         self._font_larger_btn.clicked.connect(self._increase_font_size)
         toolbar_layout.addWidget(self._font_larger_btn)
         
@@ -112,13 +205,13 @@ class MetadataPanel(QWidget):
         # Buttons to adjust height
         self._height_smaller_btn = QPushButton("-", self)
         self._height_smaller_btn.setFixedSize(20, 20)
-        self._height_smaller_btn.setStyleSheet(StyleManager.get_button_style())
+        self._height_smaller_btn.setStyleSheet(btn_style)
         self._height_smaller_btn.clicked.connect(self._decrease_height)
         toolbar_layout.addWidget(self._height_smaller_btn)
         
         self._height_larger_btn = QPushButton("+", self)
         self._height_larger_btn.setFixedSize(20, 20)
-        self._height_larger_btn.setStyleSheet(StyleManager.get_button_style())
+        self._height_larger_btn.setStyleSheet(btn_style)
         self._height_larger_btn.clicked.connect(self._increase_height)
         toolbar_layout.addWidget(self._height_larger_btn)
         
@@ -131,13 +224,33 @@ class MetadataPanel(QWidget):
         self._metadata_text.setReadOnly(True)
         self._metadata_text.setMaximumHeight(self._text_height)
         self._metadata_text.setTextInteractionFlags(
-            Qt.TextInteractionFlag.TextSelectableByMouse | 
+            Qt.TextInteractionFlag.TextSelectableByMouse |
             Qt.TextInteractionFlag.TextSelectableByKeyboard
         )
         self._metadata_text.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
+        # (selection flags above kept explicit - read-only QPlainTextEdit only
+        # enables mouse selection by default)
         self._metadata_text.customContextMenuRequested.connect(self._show_text_context_menu)
-        self._update_text_style()
+        # Stylesheet applied once for colors/background - later size changes
+        # go through the document font, which skips Qt's CSS re-parse
+        self._metadata_text.setStyleSheet(StyleManager.get_text_style(self._font_size))
         layout.addWidget(self._metadata_text)
+
+        # Quick copy of the selection without a keyPressEvent override
+        copy_shortcut = QShortcut(QKeySequence.Copy, self._metadata_text)
+        copy_shortcut.setContext(Qt.WidgetShortcut)
+        copy_shortcut.activated.connect(self._copy_selected_text)
+
+        # Context menu built once - right-clicks only exec the cached instance
+        self._ctx_menu = QMenu(self)
+        copy_action = QAction(_MSG_COPY, self)
+        copy_action.triggered.connect(self._copy_selected_text)
+        self._ctx_menu.addAction(copy_action)
+        select_all_action = QAction(_MSG_SELECT_ALL, self)
+        select_all_action.triggered.connect(self._select_all_text)
+        self._ctx_menu.addAction(select_all_action)
+        # Prevent propagation to parent widget
+        self._ctx_menu.aboutToShow.connect(self.setFocus)
         
         # Action buttons
         buttons_layout = QHBoxLayout()
@@ -146,7 +259,7 @@ class MetadataPanel(QWidget):
         # Button to load an image
         self._load_image_button = QPushButton(_("Load Image"), self)
         self._load_image_button.setFixedSize(80, 20)
-        self._load_image_button.setStyleSheet(StyleManager.get_button_style())
+        self._load_image_button.setStyleSheet(btn_style)
         self._load_image_button.clicked.connect(self._load_external_image)
         buttons_layout.addWidget(self._load_image_button)
         
@@ -156,7 +269,7 @@ class MetadataPanel(QWidget):
         # Copy button
         self._copy_button = QPushButton(_("Copy"), self)
         self._copy_button.setFixedSize(60, 20)
-        self._copy_button.setStyleSheet(StyleManager.get_button_style())
+        self._copy_button.setStyleSheet(btn_style)
         self._copy_button.clicked.connect(self._copy_metadata)
         buttons_layout.addWidget(self._copy_button)
         
@@ -175,35 +288,61 @@ class MetadataPanel(QWidget):
         return self._model
     
     @model.setter
-    def model(self, model: Model):
+    def model(self, model: "Model"):
         if self._model != model:
             from ..util import Binding
             Binding.disconnect_all(self._model_bindings)
             self._model = model
+            self._format_cache.clear()
             self._setup_connections()
     
     def _update_metadata(self):
+        """Schedules a debounced metadata display update"""
+        self._update_timer.start()
+
+    def _do_update_metadata(self):
         """Updates metadata display based on selection"""
         selection = self._model.jobs.selection
         if not selection:
-            self._metadata_text.setPlainText(_("Select an image to see its metadata"))
+            # setPlainText rebuilds the whole text document - skip it when
+            # the default message is already shown
+            if self._metadata_text.toPlainText() != _MSG_SELECT:
+                self._metadata_text.setPlainText(_MSG_SELECT)
             return
         
         # Take the first selected image
         job_id, image_index = selection[0]
-        job = self._model.jobs.find(job_id)
-        
-        if not job:
-            self._metadata_text.setPlainText(_("Image not found"))
-            return
-        
-        # Format metadata
-        metadata_text = MetadataFormatter.format_for_display(job)
-        self._metadata_text.setPlainText(metadata_text)
+        key = (job_id, image_index)
+        metadata_text = self._format_cache.get(key)
+        if metadata_text is None:
+            job = self._model.jobs.find(job_id)
+
+            if not job:
+                self._metadata_text.setPlainText(_MSG_NOT_FOUND)
+                return
+
+            # Format metadata
+            metadata_text = MetadataFormatter.format_for_display(job)
+            if len(metadata_text) > _DISPLAY_CAP:
+                metadata_text = metadata_text[:_DISPLAY_CAP] + "\n\n" + _("[... truncated]")
+            self._format_cache[key] = metadata_text
+            if len(self._format_cache) > 128:
+                self._format_cache.popitem(last=False)
+        else:
+            self._format_cache.move_to_end(key)
+
+        # Rebuilding the text document is the expensive part - skip it when
+        # the displayed text is already the one we would set
+        if self._metadata_text.toPlainText() != metadata_text:
+            self._metadata_text.setPlainText(metadata_text)
     
     def _update_text_style(self):
-        """Updates text style based on font size"""
-        self._metadata_text.setStyleSheet(StyleManager.get_text_style(self._font_size))
+        """Updates text size based on font size
+        Changing the document's default font invalidates the layout once,
+        where setStyleSheet would re-tokenize the CSS and relayout everything"""
+        font = self._metadata_text.font()
+        font.setPointSize(self._font_size)
+        self._metadata_text.document().setDefaultFont(font)
     
     def _decrease_font_size(self):
         """Decreases font size"""
@@ -211,7 +350,6 @@ class MetadataPanel(QWidget):
             self._font_size -= 1
             self._update_text_style()
             # Save parameter
-            from ..settings import settings
             settings.metadata_font_size = self._font_size
     
     def _increase_font_size(self):
@@ -220,7 +358,6 @@ class MetadataPanel(QWidget):
             self._font_size += 1
             self._update_text_style()
             # Save parameter
-            from ..settings import settings
             settings.metadata_font_size = self._font_size
     
     def _decrease_height(self):
@@ -231,7 +368,6 @@ class MetadataPanel(QWidget):
             self.setMaximumHeight(self._widget_height)
             self._metadata_text.setMaximumHeight(self._text_height)
             # Save parameter
-            from ..settings import settings
             settings.metadata_widget_height = self._widget_height
     
     def _increase_height(self):
@@ -242,33 +378,18 @@ class MetadataPanel(QWidget):
             self.setMaximumHeight(self._widget_height)
             self._metadata_text.setMaximumHeight(self._text_height)
             # Save parameter
-            from ..settings import settings
             settings.metadata_widget_height = self._widget_height
     
     def _copy_metadata(self):
         """Copies metadata to clipboard"""
         text = self._metadata_text.toPlainText()
-        if text and text != _("Select an image to see its metadata") and text != _("Image not found"):
+        if text and text != _MSG_SELECT and text != _MSG_NOT_FOUND:
             clipboard = QGuiApplication.clipboard()
             clipboard.setText(text)
     
     def _show_text_context_menu(self, pos):
         """Shows context menu for metadata text"""
-        menu = QMenu(self)
-        
-        # Copy action
-        copy_action = QAction(_("Copy"), self)
-        copy_action.triggered.connect(self._copy_selected_text)
-        menu.addAction(copy_action)
-        
-        # Select all action
-        select_all_action = QAction(_("Select All"), self)
-        select_all_action.triggered.connect(self._select_all_text)
-        menu.addAction(select_all_action)
-        
-        # Prevent propagation to parent widget
-        menu.aboutToShow.connect(lambda: self.setFocus())
-        menu.exec_(self._metadata_text.mapToGlobal(pos))
+        self._ctx_menu.exec_(self._metadata_text.mapToGlobal(pos))
     
     def _copy_selected_text(self):
         """Copies selected text"""
@@ -299,20 +420,8 @@ class MetadataPanel(QWidget):
         
         self._show_image_metadata(file_path)
     
-    def _show_image_metadata(self, image_path: str):
-        """Displays metadata of an external image"""
-        from ..util import client_logger as log
-        
-        # Load image
-        pixmap = QPixmap(image_path)
-        if pixmap.isNull():
-            QMessageBox.warning(self, _("Error"), _("Unable to load image"))
-            return
-        
-        # Extract metadata
-        metadata = self._extract_image_metadata(image_path)
-        
-        # Create dialog
+    def _build_preview_dialog(self):
+        """Builds the preview dialog widgets once, kept for later reuse"""
         dlg = QDialog(self)
         dlg.setWindowTitle(_("Preview and Metadata"))
         dlg.setMinimumWidth(600)
@@ -321,124 +430,168 @@ class MetadataPanel(QWidget):
 
         # Preview
         preview = QLabel(dlg)
-        scaled_pixmap = pixmap.scaledToWidth(300, Qt.SmoothTransformation)
-        preview.setPixmap(scaled_pixmap)
         preview.setAlignment(Qt.AlignCenter)
         preview.setStyleSheet("border: 1px solid #555; border-radius: 3px; padding: 8px;")
         vbox.addWidget(preview)
 
         # Metadata
-        meta_text = QTextEdit(dlg)
+        meta_text = QPlainTextEdit(dlg)
         meta_text.setReadOnly(True)
         meta_text.setMaximumHeight(350)
         meta_text.setTextInteractionFlags(
-            Qt.TextInteractionFlag.TextSelectableByMouse | 
+            Qt.TextInteractionFlag.TextSelectableByMouse |
             Qt.TextInteractionFlag.TextSelectableByKeyboard
         )
         meta_text.setStyleSheet(StyleManager.get_text_style(12))
-        
-        if metadata:
-            formatted_lines = []
-            has_ai_metadata = False
-            
-            # Check first if we have our JSON metadata
-            if "AI_METADATA_JSON" in metadata:
-                has_ai_metadata = True
-                ai_metadata = metadata["AI_METADATA_JSON"]
-                
-                formatted_lines.append("=== AI METADATA (Krita Extension) ===")
-                formatted_lines.append("")
-                
-                # Display basic metadata
-                if "prompt" in ai_metadata:
-                    formatted_lines.append("PROMPT:")
-                    formatted_lines.append(ai_metadata["prompt"])
-                    formatted_lines.append("")
-                
-                if "negative_prompt" in ai_metadata and ai_metadata["negative_prompt"]:
-                    formatted_lines.append("NEGATIVE PROMPT:")
-                    formatted_lines.append(ai_metadata["negative_prompt"])
-                    formatted_lines.append("")
-                
-                if "seed" in ai_metadata:
-                    formatted_lines.append("PARAMETERS:")
-                    formatted_lines.append(f"Seed: {ai_metadata['seed']}")
-                    if "strength" in ai_metadata:
-                        formatted_lines.append(f"Strength: {ai_metadata['strength'] * 100:.1f}%")
-                    formatted_lines.append("")
-                
-                if "style" in ai_metadata and ai_metadata["style"]:
-                    formatted_lines.append("STYLE:")
-                    formatted_lines.append(ai_metadata["style"])
-                    formatted_lines.append("")
-                
-                if "checkpoint" in ai_metadata and ai_metadata["checkpoint"]:
-                    formatted_lines.append("CHECKPOINT:")
-                    formatted_lines.append(ai_metadata["checkpoint"])
-                    formatted_lines.append("")
-            
-            # Display all found metadata
-            if has_ai_metadata:
-                formatted_lines.append("")
-                formatted_lines.append("=== DETECTED AI METADATA ===")
-                formatted_lines.append("")
-            else:
-                formatted_lines.append("")
-                formatted_lines.append("=== AVAILABLE METADATA ===")
-                formatted_lines.append("")
-            
-            # Display all metadata
-            for key, value in metadata.items():
-                if key != "AI_METADATA_JSON":
-                    formatted_lines.append(f"{key}: {value}")
-            
-            meta_text.setPlainText("\n".join(formatted_lines))
-        else:
-            meta_text.setPlainText(_("No metadata found in this image"))
-        
         vbox.addWidget(meta_text)
-        
+
         # Buttons
         buttons_layout = QHBoxLayout()
+
+        # Only visible when the metadata exceeds the display cap
+        show_full_button = QPushButton(_("Show full"), dlg)
+        show_full_button.clicked.connect(self._show_full_metadata)
+        show_full_button.setVisible(False)
+        buttons_layout.addWidget(show_full_button)
         buttons_layout.addStretch()
-        
+
         close_button = QPushButton(_("Close"), dlg)
         close_button.clicked.connect(dlg.accept)
         buttons_layout.addWidget(close_button)
-        
+
         vbox.addLayout(buttons_layout)
-        dlg.exec_()
-    
-    def _extract_image_metadata(self, image_path: str) -> Dict[str, Any]:
-        """Extracts metadata from an image"""
+        self._preview_dialog = dlg
+        self._preview_label = preview
+        self._preview_meta_text = meta_text
+        self._show_full_button = show_full_button
+
+    def _on_preview_loaded(self, metadata, image):
+        """Fills the preview dialog once the background decode finishes"""
+        if image.isNull():
+            self._preview_label.setText(_("Unable to load image"))
+        else:
+            if image.width() > 300:
+                # Codec could not pre-scale (size unknown before decode) -
+                # nearest-neighbour is imperceptible at this ratio and
+                # several times cheaper than a smooth resample
+                image = image.scaledToWidth(300, Qt.FastTransformation)
+            self._preview_label.setPixmap(QPixmap.fromImage(image))
+        if metadata:
+            full = self._format_external_metadata(metadata)
+            self._full_metadata = full
+            if len(full) > _DISPLAY_CAP:
+                full = full[:_DISPLAY_CAP] + "\n\n" + _("[... truncated - use 'Show full' for the rest]")
+                self._show_full_button.setVisible(True)
+            else:
+                self._show_full_button.setVisible(False)
+            self._preview_meta_text.setPlainText(full)
+        else:
+            self._full_metadata = None
+            self._show_full_button.setVisible(False)
+            self._preview_meta_text.setPlainText(_("No metadata found in this image"))
+
+    def _show_full_metadata(self):
+        """Opens the untruncated metadata in a modeless plain-text dialog"""
+        dlg = QDialog(self)
+        dlg.setAttribute(Qt.WA_DeleteOnClose)
+        dlg.setWindowTitle(_("Full Metadata"))
+        dlg.setMinimumWidth(700)
+        dlg.setMinimumHeight(600)
+        vbox = QVBoxLayout(dlg)
+        text = QPlainTextEdit(dlg)
+        text.setReadOnly(True)
+        text.setPlainText(self._full_metadata or "")
+        vbox.addWidget(text)
+        dlg.show()
+
+    def _show_image_metadata(self, image_path: str):
+        """Displays metadata of an external image"""
+        # The dialog opens immediately with a placeholder - decoding and
+        # metadata extraction run on the global thread pool and fill it in,
+        # so multi-MB images never block the event loop
+        if self._preview_dialog is None:
+            self._build_preview_dialog()
+        self._preview_label.setText(_("Loading..."))
+        self._preview_meta_text.setPlainText("")
+
+        task = _ImageLoadTask(image_path, preview_width=300)
+        task.signals.finished.connect(self._on_preview_loaded)
+        QThreadPool.globalInstance().start(task)
+
+        self._preview_dialog.exec_()
+
+    def _format_external_metadata(self, metadata: Dict[str, Any]) -> str:
+        """Formats extracted metadata for the preview dialog"""
+        # Build multi-line sections directly instead of appending every line
+        # to a list - far fewer Python-level allocations per image
+        sections = []
+        ai_metadata = metadata.get("AI_METADATA_JSON")
+        if ai_metadata is not None:
+            sections.append("=== AI METADATA (Krita Extension) ===\n")
+
+            # Basic metadata
+            if "prompt" in ai_metadata:
+                sections.append(f"PROMPT:\n{ai_metadata['prompt']}\n")
+
+            if ai_metadata.get("negative_prompt"):
+                sections.append(f"NEGATIVE PROMPT:\n{ai_metadata['negative_prompt']}\n")
+
+            if "seed" in ai_metadata:
+                params = f"PARAMETERS:\nSeed: {ai_metadata['seed']}"
+                if "strength" in ai_metadata:
+                    params += f"\nStrength: {ai_metadata['strength'] * 100:.1f}%"
+                sections.append(params + "\n")
+
+            if ai_metadata.get("style"):
+                sections.append(f"STYLE:\n{ai_metadata['style']}\n")
+
+            if ai_metadata.get("checkpoint"):
+                sections.append(f"CHECKPOINT:\n{ai_metadata['checkpoint']}\n")
+
+            sections.append("\n=== DETECTED AI METADATA ===\n")
+        else:
+            sections.append("\n=== AVAILABLE METADATA ===\n")
+
+        # Dump of all found metadata, joined without an intermediate list
+        sections.append("\n".join(
+            f"{key}: {value}" for key, value in metadata.items()
+            if key != "AI_METADATA_JSON"
+        ))
+        return "\n".join(sections)
+
+    @staticmethod
+    def _extract_image_metadata(reader: QImageReader) -> Dict[str, Any]:
+        """Extracts metadata from an image via the caller's QImageReader"""
         metadata = {}
-        
+
         try:
-            # Read image with QImageReader to access metadata
-            reader = QImageReader(image_path)
-            
-            # Custom PNG metadata
-            if image_path.lower().endswith('.png'):
-                # Look for our custom JSON metadata
-                json_metadata = reader.text("metadata")
-                if json_metadata:
+            # The detected format also covers renamed files, unlike a check
+            # on the filename extension
+            fmt = reader.format()
+            is_png = fmt == b'png'
+
+            # For PNGs, read the text chunks directly from the byte stream;
+            # other formats go through the reader, one pass per key either way
+            if is_png:
+                items = _read_png_text_chunks(reader.fileName()).items()
+            else:
+                items = ((key, reader.text(key)) for key in reader.textKeys())
+            for key, value in items:
+                if key == "metadata" and is_png:
+                    # Our custom JSON metadata
                     try:
-                        ai_metadata = json.loads(json_metadata)
-                        metadata["AI_METADATA_JSON"] = ai_metadata
+                        metadata["AI_METADATA_JSON"] = json.loads(value)
                     except json.JSONDecodeError:
                         pass
-            
-            # EXIF and other metadata
-            for key in reader.textKeys():
-                if key not in ["metadata"]:  # Avoid duplicates
-                    metadata[key] = reader.text(key)
-            
+                else:
+                    metadata[key] = value
+
             # Basic image information
             if reader.size().isValid():
                 metadata["Dimensions"] = f"{reader.size().width()}x{reader.size().height()}"
             
-            if reader.format():
-                metadata["Format"] = str(reader.format(), 'utf-8')
+            if fmt:
+                metadata["Format"] = str(fmt, 'utf-8')
             
         except Exception as e:
             from ..util import client_logger as log
@@ -4,18 +4,115 @@ All user interface components specific to custom features
 """
 
 from PyQt5.QtWidgets import (
-    QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, 
-    QTextEdit, QMenu, QAction, QDialog, QMessageBox, QFileDialog,
-    QSpinBox, QCheckBox, QFrame, QTabWidget, QScrollArea
+    QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
+    QDialog, QMessageBox, QFileDialog, QCheckBox, QFrame, QTabWidget
 )
-from PyQt5.QtCore import Qt, QSize
-from PyQt5.QtGui import QGuiApplication, QPixmap, QImage, QImageReader
+from PyQt5.QtCore import QSize
 
+import json
+
+from .auto_save import auto_save_all_history_images
 from .metadata_panel import MetadataPanel
-from .settings_extensions import AutoSaveSettingsWidget, MetadataSettingsWidget
+from .settings_extensions import AutoSaveSettingsWidget
 from .utils import StyleManager
-from ..ui.theme import theme
 from ..localization import _
+from ..root import root
+from ..settings import settings
+
+# Prefer orjson (C implementation, several times faster) when available
+try:
+    import orjson
+
+    def _write_config(file_path, obj):
+        # orjson serializes in C to a single bytes object - one write call
+        with open(file_path, 'wb') as f:
+            f.write(orjson.dumps(obj, option=orjson.OPT_INDENT_2))
+
+    _loads_config = orjson.loads
+except ImportError:
+    _JSON_ENCODER = json.JSONEncoder(indent=2, ensure_ascii=False)
+
+    def _write_config(file_path, obj):
+        # iterencode streams tokens through the 64 KiB write buffer - peak
+        # memory stays flat even if the exported payload grows
+        with open(file_path, 'w', encoding='utf-8', buffering=1 << 16) as f:
+            f.writelines(_JSON_ENCODER.iterencode(obj))
+
+    _loads_config = json.loads
+
+# Style strings resolved once for the process - every widget instantiation
+# reuses the same CSS instead of rebuilding it
+_BUTTON_STYLE = StyleManager.get_button_style()
+
+# Button-flag combination computed once instead of per dialog
+_QMB_YES_NO = QMessageBox.Yes | QMessageBox.No
+
+# Fixed sizes shared across instantiations - passing a cached QSize skips
+# the implicit int-pair to QSize conversion on every setFixedSize call
+_SZ_DIALOG = QSize(400, 300)
+_SZ_BUTTON_MD = QSize(80, 24)
+_SZ_BUTTON_SM = QSize(60, 24)
+_SZ_BUTTON_CFG = QSize(50, 20)
+
+# One QSS per widget tree, matched by object name - Qt parses it once at the
+# root instead of once per label
+_ADVANCED_QSS = "QLabel#sectionTitle { font-weight: bold; font-size: 14px; }"
+_STATUS_QSS = (
+    "QLabel#statusIcon { font-size: 16px; }"
+    " QLabel#statusText { color: #e0e0e0; font-size: 11px; }"
+)
+
+# Strings translated once at import - widget constructors and message boxes
+# reuse them instead of querying gettext per instantiation
+_NO_ACTIVE = _("No active features")
+_ACTIVE_FMT = _("{} active features")
+_T_SUCCESS = _("Success")
+_T_CONFIRM = _("Confirmation")
+_T_CONFIG = _("Config")
+_T_METADATA = _("Metadata")
+_T_SAVE = _("Save")
+_T_OK = _("OK")
+_T_CANCEL = _("Cancel")
+_T_EXPORT_CONFIG = _("Export Configuration")
+_T_IMPORT_CONFIG = _("Import Configuration")
+_T_JSON_FILTER = _("JSON Files (*.json)")
+
+# Shared margin presets, applied through one helper - a single Python call
+# instead of repeated sip-boundary crossings in every setup_ui
+_MARGINS_STD = (10, 10, 10, 10)
+_MARGINS_TIGHT = (5, 2, 5, 2)
+
+
+def _apply_layout(layout, margins, spacing=None):
+    layout.setContentsMargins(*margins)
+    if spacing is not None:
+        layout.setSpacing(spacing)
+
+
+def _section(title_text):
+    """Builds a titled StyledPanel section, returns (frame, inner layout)
+    The title label picks up its styling from the parent stylesheet via
+    its object name, so no per-label setStyleSheet parse is needed"""
+    frame = QFrame()
+    frame.setFrameStyle(QFrame.StyledPanel)
+    layout = QVBoxLayout(frame)
+    title = QLabel(title_text)
+    title.setObjectName("sectionTitle")
+    layout.addWidget(title)
+    return frame, layout
+
+
+# Settings the status widget reacts to - anything else is ignored
+_STATUS_KEYS = frozenset(("auto_save_generated", "show_metadata_interface"))
+
+# Settings accepted from an imported configuration file
+_IMPORTABLE_KEYS = (
+    "auto_save_generated",
+    "auto_save_folder",
+    "show_metadata_interface",
+    "metadata_font_size",
+    "metadata_widget_height",
+)
 
 
 class CustomFeaturesTabWidget(QTabWidget):
@@ -26,18 +123,32 @@ class CustomFeaturesTabWidget(QTabWidget):
     
     def __init__(self, parent=None):
         super().__init__(parent)
+        self._built = set()
         self.setup_tabs()
-    
+
     def setup_tabs(self):
         """Configure custom feature tabs"""
-        # Metadata and Downloads tab
-        from .metadata_downloads_widget import MetadataDownloadsWidget
-        self.metadata_downloads_tab = MetadataDownloadsWidget()
-        self.addTab(self.metadata_downloads_tab, _("Metadata and Downloads"))
-        
-        # Advanced configuration tab
-        self.advanced_tab = AdvancedSettingsWidget()
-        self.addTab(self.advanced_tab, _("Advanced Configuration"))
+        # Placeholders only - each tab's widget tree is built on first visit,
+        # so opening the dialog constructs one sub-tree instead of all of them
+        self.addTab(QWidget(), _("Metadata and Downloads"))
+        self.addTab(QWidget(), _("Advanced Configuration"))
+        self.currentChanged.connect(self._ensure_tab)
+        self._ensure_tab(0)
+
+    def _ensure_tab(self, index: int):
+        """Builds the real widget for a tab the first time it is shown"""
+        if index in self._built:
+            return
+        self._built.add(index)
+        if index == 0:
+            from .metadata_downloads_widget import MetadataDownloadsWidget
+            self.metadata_downloads_tab = widget = MetadataDownloadsWidget()
+        else:
+            self.advanced_tab = widget = AdvancedSettingsWidget()
+        label = self.tabText(index)
+        self.removeTab(index)
+        self.insertTab(index, widget, label)
+        self.setCurrentIndex(index)
 
 
 class AdvancedSettingsWidget(QWidget):
@@ -52,17 +163,12 @@ class AdvancedSettingsWidget(QWidget):
     def setup_ui(self):
         """Configure the user interface"""
         layout = QVBoxLayout(self)
-        layout.setContentsMargins(10, 10, 10, 10)
-        
+        _apply_layout(layout, _MARGINS_STD)
+        self.setStyleSheet(_ADVANCED_QSS)
+
         # Configuration section
-        config_group = QFrame()
-        config_group.setFrameStyle(QFrame.StyledPanel)
-        config_layout = QVBoxLayout(config_group)
-        
-        config_title = QLabel(_("Feature Configuration"))
-        config_title.setStyleSheet("font-weight: bold; font-size: 14px;")
-        config_layout.addWidget(config_title)
-        
+        config_group, config_layout = _section(_("Feature Configuration"))
+
         # Debug options
         self.debug_checkbox = QCheckBox(_("Debug mode for custom features"))
         config_layout.addWidget(self.debug_checkbox)
@@ -74,14 +180,8 @@ class AdvancedSettingsWidget(QWidget):
         layout.addWidget(config_group)
         
         # Maintenance section
-        maintenance_group = QFrame()
-        maintenance_group.setFrameStyle(QFrame.StyledPanel)
-        maintenance_layout = QVBoxLayout(maintenance_group)
-        
-        maintenance_title = QLabel(_("Maintenance"))
-        maintenance_title.setStyleSheet("font-weight: bold; font-size: 14px;")
-        maintenance_layout.addWidget(maintenance_title)
-        
+        maintenance_group, maintenance_layout = _section(_("Maintenance"))
+
         # Maintenance buttons
         buttons_layout = QHBoxLayout()
         
@@ -89,11 +189,11 @@ class AdvancedSettingsWidget(QWidget):
         self.reset_button.clicked.connect(self.reset_settings)
         buttons_layout.addWidget(self.reset_button)
         
-        self.export_button = QPushButton(_("Export Configuration"))
+        self.export_button = QPushButton(_T_EXPORT_CONFIG)
         self.export_button.clicked.connect(self.export_config)
         buttons_layout.addWidget(self.export_button)
         
-        self.import_button = QPushButton(_("Import Configuration"))
+        self.import_button = QPushButton(_T_IMPORT_CONFIG)
         self.import_button.clicked.connect(self.import_config)
         buttons_layout.addWidget(self.import_button)
         
@@ -106,13 +206,12 @@ class AdvancedSettingsWidget(QWidget):
         """Reset custom feature settings"""
         reply = QMessageBox.question(
             self, 
-            _("Confirmation"), 
+            _T_CONFIRM, 
             _("Are you sure you want to reset all custom feature settings?"),
-            QMessageBox.Yes | QMessageBox.No
+            _QMB_YES_NO
         )
         
         if reply == QMessageBox.Yes:
-            from ..settings import settings
             # Reset settings
             settings.auto_save_generated = False
             settings.auto_save_folder = "generated_images"
@@ -120,22 +219,18 @@ class AdvancedSettingsWidget(QWidget):
             settings.metadata_font_size = 12
             settings.metadata_widget_height = 280
             settings.save()
-            QMessageBox.information(self, _("Success"), _("Settings reset"))
+            QMessageBox.information(self, _T_SUCCESS, _("Settings reset"))
     
     def export_config(self):
         """Export configuration"""
-        file_path, _ = QFileDialog.getSaveFileName(
+        file_path, _filter = QFileDialog.getSaveFileName(
             self,
-            _("Export Configuration"),
+            _T_EXPORT_CONFIG,
             "",
-            _("JSON Files (*.json)")
+            _T_JSON_FILTER
         )
         
         if file_path:
-            from ..settings import settings
-            import json
-            from pathlib import Path
-            
             config_data = {
                 "auto_save_generated": settings.auto_save_generated,
                 "auto_save_folder": settings.auto_save_folder,
@@ -144,42 +239,31 @@ class AdvancedSettingsWidget(QWidget):
                 "metadata_widget_height": settings.metadata_widget_height
             }
             
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(config_data, f, indent=2, ensure_ascii=False)
-            
-            QMessageBox.information(self, _("Success"), _("Configuration exported"))
+            _write_config(file_path, config_data)
+
+            QMessageBox.information(self, _T_SUCCESS, _("Configuration exported"))
     
     def import_config(self):
         """Import configuration"""
-        file_path, _ = QFileDialog.getOpenFileName(
+        file_path, _filter = QFileDialog.getOpenFileName(
             self,
-            _("Import Configuration"),
+            _T_IMPORT_CONFIG,
             "",
-            _("JSON Files (*.json)")
+            _T_JSON_FILTER
         )
         
         if file_path:
-            from ..settings import settings
-            import json
-            from pathlib import Path
-            
-            with open(file_path, 'r', encoding='utf-8') as f:
-                config_data = json.load(f)
-            
-            # Apply settings
-            if "auto_save_generated" in config_data:
-                settings.auto_save_generated = config_data["auto_save_generated"]
-            if "auto_save_folder" in config_data:
-                settings.auto_save_folder = config_data["auto_save_folder"]
-            if "show_metadata_interface" in config_data:
-                settings.show_metadata_interface = config_data["show_metadata_interface"]
-            if "metadata_font_size" in config_data:
-                settings.metadata_font_size = config_data["metadata_font_size"]
-            if "metadata_widget_height" in config_data:
-                settings.metadata_widget_height = config_data["metadata_widget_height"]
+            with open(file_path, 'rb') as f:
+                config_data = _loads_config(f.read())
             
+            # Apply settings - one lookup per allowlisted key
+            for key in _IMPORTABLE_KEYS:
+                value = config_data.get(key)
+                if value is not None:
+                    setattr(settings, key, value)
+
             settings.save()
-            QMessageBox.information(self, _("Success"), _("Configuration imported"))
+            QMessageBox.information(self, _T_SUCCESS, _("Configuration imported"))
 
 
 class CustomFeaturesStatusWidget(QWidget):
@@ -187,51 +271,66 @@ class CustomFeaturesStatusWidget(QWidget):
     Widget to display custom feature status
     Can be integrated into status bar or as floating widget
     """
-    
+
+    # Fixed attribute set - skips per-instance __dict__ entries on PyQt5
+    # builds whose sip honours __slots__ on QWidget subclasses (>= 5.12)
+    __slots__ = ('_last_status', 'status_icon', 'status_text', 'config_button')
+
     def __init__(self, parent=None):
         super().__init__(parent)
+        # Observer instead of polling - the widget recomputes only when one
+        # of the watched settings actually changes
+        self._last_status = None
         self.setup_ui()
         self.update_status()
-    
+        settings.changed.connect(self._on_setting_changed)
+
     def setup_ui(self):
         """Configure the user interface"""
         layout = QHBoxLayout(self)
-        layout.setContentsMargins(5, 2, 5, 2)
-        
+        _apply_layout(layout, _MARGINS_TIGHT)
+        self.setStyleSheet(_STATUS_QSS)
+
         # Status icon
         self.status_icon = QLabel("🔧")
-        self.status_icon.setStyleSheet("font-size: 16px;")
+        self.status_icon.setObjectName("statusIcon")
         layout.addWidget(self.status_icon)
         
         # Status text
         self.status_text = QLabel(_("Custom Features"))
-        self.status_text.setStyleSheet("color: #e0e0e0; font-size: 11px;")
+        self.status_text.setObjectName("statusText")
         layout.addWidget(self.status_text)
         
         # Quick configuration button
-        self.config_button = QPushButton(_("Config"))
-        self.config_button.setFixedSize(50, 20)
-        self.config_button.setStyleSheet(StyleManager.get_button_style())
+        self.config_button = QPushButton(_T_CONFIG)
+        self.config_button.setFixedSize(_SZ_BUTTON_CFG)
+        self.config_button.setStyleSheet(_BUTTON_STYLE)
         self.config_button.clicked.connect(self.show_quick_config)
         layout.addWidget(self.config_button)
     
+    def _on_setting_changed(self, key: str, value=None):
+        """Reacts to settings changes, filtered on the watched keys"""
+        if key in _STATUS_KEYS:
+            self.update_status()
+
     def update_status(self):
         """Updates status display"""
-        from ..settings import settings
-        
-        # Check enabled features via settings
-        enabled_features = []
-        if settings.auto_save_generated:
-            enabled_features.append("Automatic Save")
-        if settings.show_metadata_interface:
-            enabled_features.append("Metadata Panel")
-        
-        if enabled_features:
+        state = (settings.auto_save_generated, settings.show_metadata_interface)
+        if state == self._last_status:
+            # Nothing changed - skip the setText calls and the relayout
+            # they would trigger
+            return
+        self._last_status = state
+
+        # Only the count matters - sum the booleans, no list to allocate
+        count = int(state[0]) + int(state[1])
+
+        if count:
             self.status_icon.setText("✅")
-            self.status_text.setText(f"{len(enabled_features)} active features")
+            self.status_text.setText(_ACTIVE_FMT.format(count))
         else:
             self.status_icon.setText("⚠️")
-            self.status_text.setText(_("No active features"))
+            self.status_text.setText(_NO_ACTIVE)
     
     def show_quick_config(self):
         """Shows quick configuration"""
@@ -247,16 +346,20 @@ class QuickConfigDialog(QDialog):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setWindowTitle(_("Quick Configuration - Custom Features"))
-        self.setFixedSize(400, 300)
+        self.setFixedSize(_SZ_DIALOG)
         self.setup_ui()
     
     def setup_ui(self):
         """Configure the user interface"""
         layout = QVBoxLayout(self)
-        
-        # Feature list based on settings
-        from ..settings import settings
-        
+
+        # Snapshot for Cancel - toggles only touch the in-memory settings
+        # until OK commits them
+        self._snapshot = {
+            "auto_save_generated": settings.auto_save_generated,
+            "show_metadata_interface": settings.show_metadata_interface,
+        }
+
         # Automatic save feature
         auto_save_widget = FeatureToggleWidget("auto_save", {
             "name": "Automatic Save",
@@ -274,22 +377,35 @@ class QuickConfigDialog(QDialog):
         # Buttons
         buttons_layout = QHBoxLayout()
         
-        self.ok_button = QPushButton(_("OK"))
-        self.ok_button.clicked.connect(self.accept)
+        self.ok_button = QPushButton(_T_OK)
+        self.ok_button.clicked.connect(self._commit_and_accept)
         buttons_layout.addWidget(self.ok_button)
-        
-        self.cancel_button = QPushButton(_("Cancel"))
+
+        self.cancel_button = QPushButton(_T_CANCEL)
         self.cancel_button.clicked.connect(self.reject)
         buttons_layout.addWidget(self.cancel_button)
-        
+
         layout.addLayout(buttons_layout)
 
+    def _commit_and_accept(self):
+        """Persists all toggles with a single settings write"""
+        settings.save()
+        self.accept()
+
+    def reject(self):
+        """Cancel/Escape rolls the in-memory toggles back to the snapshot"""
+        settings.auto_save_generated = self._snapshot["auto_save_generated"]
+        settings.show_metadata_interface = self._snapshot["show_metadata_interface"]
+        super().reject()
+
 
 class FeatureToggleWidget(QWidget):
     """
     Widget to enable/disable a feature
     """
-    
+
+    __slots__ = ('feature_name', 'feature_config', 'enable_checkbox')
+
     def __init__(self, feature_name: str, feature_config, parent=None):
         super().__init__(parent)
         self.feature_name = feature_name
@@ -299,7 +415,7 @@ class FeatureToggleWidget(QWidget):
     def setup_ui(self):
         """Configure the user interface"""
         layout = QHBoxLayout(self)
-        layout.setContentsMargins(5, 2, 5, 2)
+        _apply_layout(layout, _MARGINS_TIGHT)
         
         # Checkbox to enable/disable
         self.enable_checkbox = QCheckBox(self.feature_config["name"])
@@ -311,14 +427,11 @@ class FeatureToggleWidget(QWidget):
     
     def toggle_feature(self, enabled: bool):
         """Enable or disable the feature"""
-        from ..settings import settings
-        
+        # Only mutate in memory - the owning dialog saves once on accept
         if self.feature_name == "auto_save":
             settings.auto_save_generated = enabled
         elif self.feature_name == "metadata_panel":
             settings.show_metadata_interface = enabled
-        
-        settings.save()
 
 
 class CustomFeaturesToolbar(QWidget):
@@ -326,32 +439,34 @@ class CustomFeaturesToolbar(QWidget):
     Toolbar for custom features
     Can be integrated into main interface
     """
-    
+
+    __slots__ = ('_config_dialog', 'metadata_button', 'save_button', 'config_button')
+
     def __init__(self, parent=None):
         super().__init__(parent)
+        self._config_dialog = None
         self.setup_ui()
-    
+
     def setup_ui(self):
         """Configure the user interface"""
         layout = QHBoxLayout(self)
-        layout.setContentsMargins(2, 2, 2, 2)
-        layout.setSpacing(4)
+        _apply_layout(layout, (2, 2, 2, 2), spacing=4)
         
         # Button to show metadata
-        self.metadata_button = QPushButton(_("Metadata"))
-        self.metadata_button.setFixedSize(80, 24)
+        self.metadata_button = QPushButton(_T_METADATA)
+        self.metadata_button.setFixedSize(_SZ_BUTTON_MD)
         self.metadata_button.clicked.connect(self.show_metadata_panel)
         layout.addWidget(self.metadata_button)
         
         # Button for manual save
-        self.save_button = QPushButton(_("Save"))
-        self.save_button.setFixedSize(80, 24)
+        self.save_button = QPushButton(_T_SAVE)
+        self.save_button.setFixedSize(_SZ_BUTTON_MD)
         self.save_button.clicked.connect(self.manual_save)
         layout.addWidget(self.save_button)
         
         # Configuration button
-        self.config_button = QPushButton(_("Config"))
-        self.config_button.setFixedSize(60, 24)
+        self.config_button = QPushButton(_T_CONFIG)
+        self.config_button.setFixedSize(_SZ_BUTTON_SM)
         self.config_button.clicked.connect(self.show_config)
         layout.addWidget(self.config_button)
         
@@ -364,18 +479,24 @@ class CustomFeaturesToolbar(QWidget):
     
     def manual_save(self):
         """Launches a manual save"""
-        from .auto_save import auto_save_all_history_images
-        from ..root import root
-        
         if root.active_model:
             count = auto_save_all_history_images(root.active_model)
-            QMessageBox.information(self, _("Success"), 
+            QMessageBox.information(self, _T_SUCCESS, 
                 _("{} images have been saved").format(count))
     
     def show_config(self):
         """Shows the configuration"""
-        dialog = CustomFeaturesTabWidget(self)
-        dialog.exec_()
+        # Built once and reused - repeat opens are a show/raise instead of a
+        # full widget-tree rebuild (CustomFeaturesTabWidget is a QTabWidget,
+        # so it also needs the QDialog wrapper to be shown as a window)
+        if self._config_dialog is None:
+            dialog = QDialog(self)
+            dialog.setWindowTitle(_("Custom Features"))
+            vbox = QVBoxLayout(dialog)
+            vbox.addWidget(CustomFeaturesTabWidget(dialog))
+            self._config_dialog = dialog
+        self._config_dialog.show()
+        self._config_dialog.raise_()
 
 
 # Utility functions for UI integration
@@ -1,14 +1,16 @@
 from __future__ import annotations
 import json
+import re
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, asdict, field
 from enum import Enum
 from typing import Any
-from PyQt5.QtCore import QObject, QByteArray
+from PyQt5.QtCore import QObject, QByteArray, QTimer
 from PyQt5.QtGui import QImageReader
 from PyQt5.QtWidgets import QMessageBox
 
 from .api import InpaintMode, FillMode
-from .image import ImageCollection
+from .image import Image, ImageCollection
 from .model import Model, InpaintContext
 from .custom_workflow import CustomWorkspace
 from .control import ControlLayer, ControlLayerList
@@ -20,8 +22,57 @@ from .settings import settings
 from .localization import translate as _
 from .util import client_logger as log, encode_json
 
+# Prefer orjson (C implementation, several times faster) when available
+try:
+    import orjson
+
+    def _dumps(state) -> bytes:
+        return orjson.dumps(
+            state, default=encode_json, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS
+        )
+
+    def _dumps_compact(obj) -> str:
+        # orjson is compact by default and does not escape non-ASCII
+        return orjson.dumps(obj, default=encode_json).decode("utf-8")
+
+    _loads = orjson.loads
+except ImportError:
+    def _dumps(state) -> bytes:
+        return json.dumps(state, indent=2, default=encode_json).encode("utf-8")
+
+    def _dumps_compact(obj) -> str:
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), default=encode_json)
+
+    _loads = json.loads
+
+# Optional binary framing for the state annotation - msgpack encodes an
+# order of magnitude faster than JSON and yields a smaller payload
+try:
+    import msgspec
+
+    _msgpack_encode = msgspec.msgpack.Encoder(enc_hook=encode_json).encode
+    _msgpack_decode = msgspec.msgpack.Decoder().decode
+except ImportError:
+    _msgpack_encode = None
+    _msgpack_decode = None
+
+# PNG encoding (libpng deflate) dominates auto-save wall time and runs fine
+# off the UI thread - a small pool keeps the job_finished handler snappy
+_autosave_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="ai-autosave")
+
+
+def _save_one(img: Image, path: str, metadata: dict):
+    """Écrit une image avec ses métadonnées - exécuté dans le pool"""
+    try:
+        img.save(path, metadata=metadata)
+        log.info(f"Auto-save: successfully saved {path} with JSON metadata")
+    except Exception as e:
+        log.warning(f"Auto-save failed for {path}: {e}")
+
+
 # Version of the persistence format, increment when there are breaking changes
-version = 1
+# v2 stores the state as msgpack in "ui.msgpack" (when msgspec is available)
+version = 2
 
 
 @dataclass
@@ -51,7 +102,7 @@ class RecentlyUsedSync:
 
     def track(self, model: Model):
         try:
-            if _find_annotation(model.document, "ui.json") is None:
+            if _find_state_annotation(model.document)[0] is None:
                 model.style = Styles.list().find(self.style) or Styles.list().default
                 model.batch_count = self.batch_count
                 model.translation_enabled = self.translation_enabled
@@ -108,21 +159,52 @@ class _HistoryResult:
         return _HistoryResult(**data)
 
 
+def _history_dict(item: _HistoryResult) -> dict[str, Any]:
+    """Plain-dict image of a history item, built once instead of per save
+    in_use stays a shared reference to the job's live dict, so later
+    result_used updates are reflected without rebuilding"""
+    data = asdict(item)
+    data["in_use"] = item.in_use
+    return data
+
+
 class ModelSync:
     """Synchronizes the model with the document's annotations."""
 
     _model: Model
     _history: list[_HistoryResult]
+    _history_dicts: list[dict[str, Any]]  # serialized twins of _history entries
+    _history_by_id: dict[str, int]  # job id -> index into _history
     _memory_used: dict[int, int]  # slot -> memory used for images in bytes
+    _section_cache: dict[str, Any]  # tag -> last serialized dict for the section
+    _dirty: set[str]  # section tags to re-serialize, "*" means all
     _slot_index = 0
 
     def __init__(self, model: Model):
         self._model = model
         self._history = []
+        self._history_dicts = []
+        self._history_by_id = {}
         self._memory_used = {}
-        if state_bytes := _find_annotation(model.document, "ui.json"):
+        # Sections are only re-serialized when one of their signals fired
+        # since the last save - clean ones reuse the cached dict
+        self._section_cache = {}
+        self._dirty = {"*"}
+        # Saves triggered by modified signals are debounced - a burst of
+        # signals (eg. dragging a slider) collapses into one serialization
+        self._save_timer = QTimer()
+        self._save_timer.setSingleShot(True)
+        self._save_timer.setInterval(200)
+        self._save_timer.timeout.connect(self._save_now)
+        # Written once the v1 json annotation has been re-saved as msgpack
+        self._stale_json_state = False
+        # Guards against signal cascades persisting state mid-load
+        self._loading = False
+        state_annotation, is_msgpack = _find_state_annotation(model.document)
+        if state_annotation is not None:
+            self._stale_json_state = not is_msgpack and _msgpack_encode is not None
             try:
-                self._load(model, state_bytes.data())
+                self._load(model, state_annotation.data(), is_msgpack)
             except Exception as e:
                 msg = _("Failed to load state from") + f" {model.document.filename}: {e}"
                 log.exception(msg)
@@ -130,28 +212,73 @@ class ModelSync:
         self._track(model)
 
     def _save(self):
+        if self._loading:
+            return
+        # Repeated start() calls just restart the timer - only the last
+        # request in a burst actually serializes
+        self._save_timer.start()
+
+    def _mark(self, tag: str):
+        """Flags a section as dirty and schedules a save"""
+        self._dirty.add(tag)
+        self._save()
+
+    def _section(self, tag: str, compute):
+        if "*" in self._dirty or tag in self._dirty:
+            self._section_cache[tag] = compute()
+        return self._section_cache[tag]
+
+    def _save_now(self):
+        if self._loading:
+            return
         model = self._model
-        state = _serialize(model)
+        state = dict(self._section("model", lambda: _serialize(model)))
         state["version"] = version
         state["preview_layer"] = model.preview_layer_id
-        state["inpaint"] = _serialize(model.inpaint)
-        state["upscale"] = _serialize(model.upscale)
-        state["live"] = _serialize(model.live)
-        state["animation"] = _serialize(model.animation)
-        state["custom"] = _serialize_custom(model.custom)
-        state["history"] = [asdict(h) for h in self._history]
-        state["root"] = _serialize(model.regions)
-        state["control"] = [_serialize(c) for c in model.regions.control]
-        state["regions"] = []
+        state["inpaint"] = self._section("inpaint", lambda: _serialize(model.inpaint))
+        state["upscale"] = self._section("upscale", lambda: _serialize(model.upscale))
+        state["live"] = self._section("live", lambda: _serialize(model.live))
+        state["animation"] = self._section("animation", lambda: _serialize(model.animation))
+        state["custom"] = self._section("custom", lambda: _serialize_custom(model.custom))
+        state["history"] = self._history_dicts
+        regions = self._section("regions", lambda: self._serialize_regions(model))
+        state["root"] = regions["root"]
+        state["control"] = regions["control"]
+        state["regions"] = regions["regions"]
+        self._dirty.clear()
+        if _msgpack_encode is not None:
+            payload, name = _msgpack_encode(state), "ui.msgpack"
+        else:
+            payload, name = _dumps(state), "ui.json"
+        # QByteArray must own the buffer - the document keeps shallow copies
+        # of the annotation alive long after payload is garbage-collected,
+        # so a fromRawData view here would dangle
+        model.document.annotate(name, QByteArray(payload))
+        if self._stale_json_state and name == "ui.msgpack":
+            # v1 document converted - drop the superseded json annotation
+            model.document.remove_annotation("ui.json")
+            self._stale_json_state = False
+
+    @staticmethod
+    def _serialize_regions(model: Model):
+        root = _serialize(model.regions)
+        control = [_serialize(c) for c in model.regions.control]
+        regions = []
         for region in model.regions:
-            state["regions"].append(_serialize(region))
-            state["regions"][-1]["control"] = [_serialize(c) for c in region.control]
-        state_str = json.dumps(state, indent=2, default=encode_json)
-        state_bytes = QByteArray(state_str.encode("utf-8"))
-        model.document.annotate("ui.json", state_bytes)
-
-    def _load(self, model: Model, state_bytes: bytes):
-        state = json.loads(state_bytes.decode("utf-8"))
+            regions.append(_serialize(region))
+            regions[-1]["control"] = [_serialize(c) for c in region.control]
+        return {"root": root, "control": control, "regions": regions}
+
+    def _load(self, model: Model, state_bytes: bytes, is_msgpack: bool = False):
+        self._loading = True
+        try:
+            self._load_state(model, state_bytes, is_msgpack)
+        finally:
+            self._loading = False
+
+    def _load_state(self, model: Model, state_bytes: bytes, is_msgpack: bool):
+        # bytes are accepted directly - no intermediate decode to str
+        state = _msgpack_decode(state_bytes) if is_msgpack else _loads(state_bytes)
         model.try_set_preview_layer(state.get("preview_layer", ""))
         _deserialize(model, state)
         _deserialize(model.inpaint, state.get("inpaint", {}))
@@ -177,77 +304,126 @@ class ModelSync:
                 model.jobs.set_results(job, results)
                 model.jobs.notify_finished(job)
                 self._history.append(item)
+                self._history_dicts.append(_history_dict(item))
+                self._history_by_id[item.id] = len(self._history) - 1
                 self._memory_used[item.slot] = images_bytes.size()
                 self._slot_index = max(self._slot_index, item.slot + 1)
 
     def _track(self, model: Model):
-        model.modified.connect(self._save)
-        model.inpaint.modified.connect(self._save)
-        model.upscale.modified.connect(self._save)
-        model.live.modified.connect(self._save)
-        model.animation.modified.connect(self._save)
-        model.custom.modified.connect(self._save)
+        # Each signal marks its own section so _save_now only re-serializes
+        # what actually changed
+        model.modified.connect(self._mark_model)
+        model.inpaint.modified.connect(lambda: self._mark("inpaint"))
+        model.upscale.modified.connect(lambda: self._mark("upscale"))
+        model.live.modified.connect(lambda: self._mark("live"))
+        model.animation.modified.connect(lambda: self._mark("animation"))
+        model.custom.modified.connect(lambda: self._mark("custom"))
         model.jobs.job_finished.connect(self._save_results)
         model.jobs.job_discarded.connect(self._remove_results)
         model.jobs.result_discarded.connect(self._remove_image)
-        model.jobs.result_used.connect(self._save)
-        model.jobs.selection_changed.connect(self._save)
+        model.jobs.result_used.connect(self._mark_model)
+        model.jobs.selection_changed.connect(self._mark_model)
         self._track_regions(model.regions)
 
+    def _mark_model(self):
+        self._mark("model")
+
+    def _mark_regions(self):
+        self._mark("regions")
+
     def _track_control(self, control: ControlLayer):
-        self._save()
-        control.modified.connect(self._save)
+        self._mark_regions()
+        control.modified.connect(self._mark_regions)
 
     def _track_control_layers(self, control_layers: ControlLayerList):
         control_layers.added.connect(self._track_control)
-        control_layers.removed.connect(self._save)
+        control_layers.removed.connect(self._mark_regions)
         for control in control_layers:
             self._track_control(control)
 
     def _track_region(self, region: Region):
-        region.modified.connect(self._save)
+        region.modified.connect(self._mark_regions)
         self._track_control_layers(region.control)
 
     def _track_regions(self, root_region: RootRegion):
-        root_region.added.connect(self._track_region)
-        root_region.removed.connect(self._save)
-        root_region.modified.connect(self._save)
+        root_region.added.connect(self._track_region_added)
+        root_region.removed.connect(self._mark_regions)
+        root_region.modified.connect(self._mark_regions)
         self._track_control_layers(root_region.control)
         for region in root_region:
             self._track_region(region)
 
+    def _track_region_added(self, region: Region):
+        self._mark_regions()
+        self._track_region(region)
+
     def _save_results(self, job: Job):
+        if self._loading:
+            return
         if job.kind in [JobKind.diffusion, JobKind.animation, JobKind.upscaling] and len(job.results) > 0:
             slot = self._slot_index
             self._slot_index += 1
             image_data, image_offsets = job.results.to_bytes()
             self._model.document.annotate(f"result{slot}.webp", image_data)
-            self._history.append(
-                _HistoryResult(job.id or "", slot, image_offsets, job.params, job.kind, job.in_use)
+            item = _HistoryResult(
+                job.id or "", slot, image_offsets, job.params, job.kind, job.in_use
             )
+            self._history.append(item)
+            self._history_dicts.append(_history_dict(item))
+            self._history_by_id[item.id] = len(self._history) - 1
             self._memory_used[slot] = image_data.size()
             self._prune()
-            self._save()
+            # Annotations changed - persist immediately rather than debounced
+            self._save_now()
             
             # Auto-save generated images if enabled
             if settings.auto_save_generated:
                 self._auto_save_images(job)
 
     def _remove_results(self, job: Job):
-        index = next((i for i, h in enumerate(self._history) if h.id == job.id), None)
+        if self._loading:
+            return
+        index = self._history_by_id.pop(job.id or "", None)
         if index is not None:
             item = self._history.pop(index)
+            self._history_dicts.pop(index)
+            self._reindex_history(index)
             self._model.document.remove_annotation(f"result{item.slot}.webp")
             self._memory_used.pop(item.slot, None)
-        self._save()
+        self._save_now()
+
+    def _reindex_history(self, start: int = 0):
+        """Refreshes the id map for entries at or after the given index"""
+        for i in range(start, len(self._history)):
+            self._history_by_id[self._history[i].id] = i
 
     def _remove_image(self, item: JobQueue.Item):
-        if history := next((h for h in self._history if h.id == item.job), None):
-            if job := self._model.jobs.find(item.job):
-                image_data, history.offsets = job.results.to_bytes()
-                self._model.document.annotate(f"result{history.slot}.webp", image_data)
-                self._memory_used[history.slot] = image_data.size()
-                self._save()
+        index = self._history_by_id.get(item.job)
+        if index is None:
+            return
+        history = self._history[index]
+        name = f"result{history.slot}.webp"
+        offsets = history.offsets
+        annotation = _find_annotation(self._model.document, name)
+        if annotation is not None and 0 <= item.image < len(offsets):
+            # Splice the removed image's byte range out of the stored blob -
+            # re-encoding would WebP-compress every remaining image again
+            data = annotation.data()
+            start = offsets[item.image]
+            end = offsets[item.image + 1] if item.image + 1 < len(offsets) else len(data)
+            removed = end - start
+            image_data = QByteArray(data[:start] + data[end:])
+            history.offsets = offsets[: item.image] + [
+                o - removed for o in offsets[item.image + 1 :]
+            ]
+        elif job := self._model.jobs.find(item.job):
+            image_data, history.offsets = job.results.to_bytes()
+        else:
+            return
+        self._model.document.annotate(name, image_data)
+        self._history_dicts[index]["offsets"] = history.offsets
+        self._memory_used[history.slot] = image_data.size()
+        self._save_now()
 
     @property
     def memory_used(self):
@@ -256,14 +432,19 @@ class ModelSync:
     def _prune(self):
         limit = settings.history_storage * 1024 * 1024
         used = self.memory_used
+        pruned = False
         while used > limit and len(self._history) > 0:
-            slot = self._history.pop(0).slot
-            self._model.document.remove_annotation(f"result{slot}.webp")
-            used -= self._memory_used.pop(slot, 0)
+            item = self._history.pop(0)
+            self._history_dicts.pop(0)
+            self._history_by_id.pop(item.id, None)
+            pruned = True
+            self._model.document.remove_annotation(f"result{item.slot}.webp")
+            used -= self._memory_used.pop(item.slot, 0)
+        if pruned:
+            self._reindex_history()
 
     def _auto_save_images(self, job):
         from pathlib import Path
-        import os
         from datetime import datetime
         
         # Debug: afficher le nombre d'images dans le batch
@@ -285,120 +466,62 @@ class ModelSync:
         doc_folder.mkdir(exist_ok=True)
         
         # Déterminer le type d'image selon le type de job
-        if job.kind is JobKind.upscaling:
-            image_type = "Upscale"
-        else:
-            # Déterminer le type d'image (générée ou raffinée)
-            is_refined = hasattr(job.params, 'strength') and job.params.strength < 1.0
-            image_type = "Refine" if is_refined else "ImgGenerate"
-        
+        image_type = _job_image_type(job)
+
         # Créer le sous-dossier pour le type d'image
         type_folder = doc_folder / image_type
         type_folder.mkdir(exist_ok=True)
-        
+
         # Debug: afficher les détails du job
         log.info(f"Auto-save: saving to {type_folder}, type={image_type}, job_kind={job.kind}, strength={getattr(job.params, 'strength', 'N/A')}")
-        
+
+        # Métadonnées communes au job, construites une seule fois
+        job_metadata = _build_job_metadata(job, image_type)
+
+        # Éléments invariants du nom de fichier, calculés hors de la boucle
+        prompt = str(getattr(job.params, 'name', 'image')).replace(' ', '_')[:50]
+        count = len(job.results)
+
         for i, img in enumerate(job.results):
-            # Nom de fichier : prompt, date, index, etc.
-            prompt = getattr(job.params, 'name', 'image')
-            prompt = str(prompt).replace(' ', '_')[:50]
-            
             # Timestamp unique pour chaque image (ajouter des millisecondes)
             timestamp = datetime.now().strftime('%Y%m%d-%H%M%S-%f')[:-3]  # Inclure millisecondes
-            
+
             # Ajouter le type dans le nom de fichier
-            filename = f"{prompt}_{timestamp}_{image_type}_{i}.png"
-            path = type_folder / filename
-            
+            path = type_folder / f"{prompt}_{timestamp}_{image_type}_{i}.png"
+
             # Debug: afficher chaque image sauvegardée
-            log.info(f"Auto-save: saving image {i+1}/{len(job.results)} to {path}")
-            
-            try:
-                # Préparer toutes les métadonnées dans un dictionnaire
-                all_metadata = {}
-                
-                # Métadonnées de base
-                all_metadata["prompt"] = _clean_metadata_value(job.params.prompt)
-                all_metadata["negative_prompt"] = _clean_metadata_value(job.params.metadata.get("negative_prompt", ""))
-                all_metadata["seed"] = job.params.seed
-                all_metadata["strength"] = job.params.strength
-                all_metadata["style"] = _clean_metadata_value(job.params.metadata.get("style", ""))
-                all_metadata["checkpoint"] = _clean_metadata_value(job.params.metadata.get("checkpoint", ""))
-                all_metadata["sampler"] = _clean_metadata_value(job.params.metadata.get("sampler", ""))
-                
-                # Métadonnées de génération
-                all_metadata["generation_type"] = image_type
-                all_metadata["job_kind"] = job.kind.name
-                all_metadata["timestamp"] = job.timestamp.strftime('%Y-%m-%d %H:%M:%S')
-                all_metadata["batch_index"] = i
-                all_metadata["total_images"] = len(job.results)
-                
-                # Métadonnées techniques
-                if "loras" in job.params.metadata:
-                    loras = job.params.metadata["loras"]
-                    if isinstance(loras, list):
-                        lora_list = []
-                        for lora in loras:
-                            if isinstance(lora, dict) and lora.get("enabled", True):
-                                lora_list.append({
-                                    "name": _clean_metadata_value(lora.get("name", "Unknown")),
-                                    "strength": lora.get("strength", 1.0)
-                                })
-                        all_metadata["loras"] = lora_list
-                    else:
-                        all_metadata["loras"] = str(loras)
-                
-                # Ajouter toutes les autres métadonnées du job
-                for key, value in job.params.metadata.items():
-                    if key not in ["prompt", "negative_prompt", "style", "checkpoint", "sampler", "loras"]:
-                        # Nettoyer et limiter la taille des valeurs
-                        clean_value = _clean_metadata_value(str(value))
-                        if len(clean_value) > 500:  # Limiter à 500 caractères
-                            clean_value = clean_value[:497] + "..."
-                        all_metadata[f"param_{key}"] = clean_value
-                
-                # Convertir en JSON compact et nettoyer
-                import json
-                metadata_json = json.dumps(all_metadata, ensure_ascii=False, separators=(',', ':'))
-                
-                # Limiter la taille totale du JSON (max 4KB)
-                if len(metadata_json) > 4000:
-                    # Tronquer en gardant les métadonnées essentielles
-                    essential_metadata = {
-                        "prompt": all_metadata.get("prompt", ""),
-                        "seed": all_metadata.get("seed", 0),
-                        "strength": all_metadata.get("strength", 1.0),
-                        "generation_type": all_metadata.get("generation_type", ""),
-                        "timestamp": all_metadata.get("timestamp", ""),
-                        "truncated": True
-                    }
-                    metadata_json = json.dumps(essential_metadata, ensure_ascii=False, separators=(',', ':'))
-                
-                # Créer le dictionnaire de métadonnées pour QImageWriter
-                metadata = {"metadata": metadata_json}
-                
-                # Sauvegarder avec métadonnées
-                img.save(str(path), metadata=metadata)
-                log.info(f"Auto-save: successfully saved {path} with JSON metadata ({len(metadata_json)} chars)")
-            except Exception as e:
-                log.warning(f"Auto-save failed for {path}: {e}")
+            log.info(f"Auto-save: saving image {i+1}/{count} to {path}")
 
+            # Métadonnées pour QImageWriter - seul batch_index varie
+            metadata = {"metadata": _image_metadata_json(job_metadata, i)}
+
+            # Sauvegarder avec métadonnées, encodage PNG hors du thread UI
+            # La copie isole l'image des modifications ultérieures du job
+            _autosave_pool.submit(_save_one, Image.copy(img), str(path), metadata)
 
-def _serialize(obj: QObject):
-    def converter(obj):
-        if isinstance(obj, Style):
-            return obj.filename
-        return obj
 
-    return serialize(obj, converter)
+def _style_to_filename(obj):
+    if isinstance(obj, Style):
+        return obj.filename
+    return obj
+
+
+def _serialize(obj: QObject):
+    # Module-level converter - no closure allocated per serialized section
+    return serialize(obj, _style_to_filename)
 
 
 def _deserialize(obj: QObject, data: dict[str, Any]):
+    styles = Styles.list()
+    cache: dict[str, Style] = {}
+
     def converter(type, value):
         if type is Style:
-            style = Styles.list().find(value)
-            return style or Styles.list().default
+            # Repeated style filenames resolve from the cache instead of
+            # searching the style list again
+            if (style := cache.get(value)) is None:
+                cache[value] = style = styles.find(value) or styles.default
+            return style
         return value
 
     if "unblur_strength" in data and not isinstance(data["unblur_strength"], float):
@@ -422,6 +545,16 @@ def _deserialize_custom(custom: CustomWorkspace, data: dict[str, Any], document_
         custom.set_graph(workflow_id, graph, document_name)
 
 
+def _find_state_annotation(document):
+    """Returns the stored UI state annotation and whether it is msgpack-encoded
+    v2 documents store "ui.msgpack"; "ui.json" is read for v1 compatibility
+    (and is still written when msgspec is not installed)"""
+    if _msgpack_decode is not None:
+        if result := _find_annotation(document, "ui.msgpack"):
+            return result, True
+    return _find_annotation(document, "ui.json"), False
+
+
 def _find_annotation(document, name: str):
     if result := document.find_annotation(name):
         return result
@@ -445,7 +578,7 @@ def import_prompt_from_file(model: Model):
                     model.regions.negative = negative.split("Steps:", 1)[0].strip()
             # ComfyUI
             elif text := reader.text("prompt"):
-                prompt: dict[str, dict] = json.loads(text)
+                prompt: dict[str, dict] = _loads(text)
                 for node in prompt.values():
                     if node["class_type"] in _comfy_sampler_types:
                         inputs = node["inputs"]
@@ -470,21 +603,97 @@ def _find_text_prompt(workflow: dict[str, dict], node_key: str):
     return ""
 
 
+# Caractères de contrôle (0x00-0x1F) sauf tab et newline - supprimés via
+# str.translate, un seul passage en C sans regex
+_CTRL_TABLE = dict.fromkeys(
+    list(range(0x00, 0x09)) + [0x0B, 0x0C] + list(range(0x0E, 0x20)) + [0x7F]
+)
+# Caractères Unicode problématiques
+_BAD_UNICODE = re.compile(r'[\uFFFD\uFFFE\uFFFF]')
+
+
 def _clean_metadata_value(value: str) -> str:
     """Nettoie une valeur de métadonnée en supprimant les caractères parasites et de contrôle"""
     if not isinstance(value, str):
         value = str(value)
-    
-    # Supprimer les caractères de contrôle et les caractères parasites
-    import re
-    # Supprimer les caractères de contrôle (0x00-0x1F) sauf tab et newline
-    value = re.sub(r'[\x00-\x08\x0B\x0C\x0E-\x1F\x7F]', '', value)
-    # Supprimer les caractères Unicode problématiques
-    value = re.sub(r'[\uFFFD\uFFFE\uFFFF]', '', value)
-    # Nettoyer les espaces en début et fin
-    value = value.strip()
-    
-    return value
+    return _BAD_UNICODE.sub('', value.translate(_CTRL_TABLE)).strip()
+
+
+def _job_image_type(job) -> str:
+    """Détermine le type d'image selon le type de job"""
+    if job.kind is JobKind.upscaling:
+        return "Upscale"
+    # Déterminer le type d'image (générée ou raffinée)
+    is_refined = hasattr(job.params, 'strength') and job.params.strength < 1.0
+    return "Refine" if is_refined else "ImgGenerate"
+
+
+def _build_job_metadata(job, image_type: str) -> dict:
+    """Construit les métadonnées communes à toutes les images du job
+    Calculées une seule fois par job - seul batch_index varie par image"""
+    all_metadata = {}
+
+    # Métadonnées de base
+    all_metadata["prompt"] = _clean_metadata_value(job.params.prompt)
+    all_metadata["negative_prompt"] = _clean_metadata_value(job.params.metadata.get("negative_prompt", ""))
+    all_metadata["seed"] = job.params.seed
+    all_metadata["strength"] = job.params.strength
+    all_metadata["style"] = _clean_metadata_value(job.params.metadata.get("style", ""))
+    all_metadata["checkpoint"] = _clean_metadata_value(job.params.metadata.get("checkpoint", ""))
+    all_metadata["sampler"] = _clean_metadata_value(job.params.metadata.get("sampler", ""))
+
+    # Métadonnées de génération
+    all_metadata["generation_type"] = image_type
+    all_metadata["job_kind"] = job.kind.name
+    all_metadata["timestamp"] = job.timestamp.strftime('%Y-%m-%d %H:%M:%S')
+    all_metadata["total_images"] = len(job.results)
+
+    # Métadonnées techniques
+    if "loras" in job.params.metadata:
+        loras = job.params.metadata["loras"]
+        if isinstance(loras, list):
+            lora_list = []
+            for lora in loras:
+                if isinstance(lora, dict) and lora.get("enabled", True):
+                    lora_list.append({
+                        "name": _clean_metadata_value(lora.get("name", "Unknown")),
+                        "strength": lora.get("strength", 1.0)
+                    })
+            all_metadata["loras"] = lora_list
+        else:
+            all_metadata["loras"] = str(loras)
+
+    # Ajouter toutes les autres métadonnées du job
+    for key, value in job.params.metadata.items():
+        if key not in ["prompt", "negative_prompt", "style", "checkpoint", "sampler", "loras"]:
+            # Nettoyer et limiter la taille des valeurs
+            clean_value = _clean_metadata_value(str(value))
+            if len(clean_value) > 500:  # Limiter à 500 caractères
+                clean_value = clean_value[:497] + "..."
+            all_metadata[f"param_{key}"] = clean_value
+
+    return all_metadata
+
+
+def _image_metadata_json(all_metadata: dict, batch_index: int) -> str:
+    """JSON compact des métadonnées pour une image du batch"""
+    all_metadata["batch_index"] = batch_index
+    metadata_json = _dumps_compact(all_metadata)
+
+    # Limiter la taille totale du JSON (max 4KB)
+    if len(metadata_json) > 4000:
+        # Tronquer en gardant les métadonnées essentielles
+        essential_metadata = {
+            "prompt": all_metadata.get("prompt", ""),
+            "seed": all_metadata.get("seed", 0),
+            "strength": all_metadata.get("strength", 1.0),
+            "generation_type": all_metadata.get("generation_type", ""),
+            "timestamp": all_metadata.get("timestamp", ""),
+            "truncated": True
+        }
+        metadata_json = _dumps_compact(essential_metadata)
+
+    return metadata_json
 
 
 def _auto_save_images_from_history(model):
@@ -511,104 +720,44 @@ def _auto_save_images_from_history(model):
     doc_folder.mkdir(exist_ok=True)
     
     total_saved = 0
-    
+    seen_dirs: set = set()
+
     # Parcourir tous les jobs finis
     for job in model.jobs._entries:
         if job.state != JobState.finished or len(job.results) == 0:
             continue
             
         # Déterminer le type d'image selon le type de job
-        if job.kind is JobKind.upscaling:
-            image_type = "Upscale"
-        else:
-            # Déterminer le type d'image (générée ou raffinée)
-            is_refined = hasattr(job.params, 'strength') and job.params.strength < 1.0
-            image_type = "Refine" if is_refined else "ImgGenerate"
-        
-        # Créer le sous-dossier pour le type d'image
+        image_type = _job_image_type(job)
+
+        # Créer le sous-dossier pour le type d'image, une fois par dossier
+        # distinct sur l'ensemble des jobs
         type_folder = doc_folder / image_type
-        type_folder.mkdir(exist_ok=True)
-        
+        if type_folder not in seen_dirs:
+            type_folder.mkdir(exist_ok=True)
+            seen_dirs.add(type_folder)
+
+        # Métadonnées communes au job, construites une seule fois
+        job_metadata = _build_job_metadata(job, image_type)
+
+        # Éléments invariants du nom de fichier, calculés hors de la boucle
+        prompt = str(getattr(job.params, 'name', 'image')).replace(' ', '_')[:50]
+
         for i, img in enumerate(job.results):
-            # Nom de fichier : prompt, date, index, etc.
-            prompt = getattr(job.params, 'name', 'image')
-            prompt = str(prompt).replace(' ', '_')[:50]
-            
             # Timestamp unique pour chaque image (ajouter des millisecondes)
             timestamp = datetime.now().strftime('%Y%m%d-%H%M%S-%f')[:-3]  # Inclure millisecondes
-            
+
             # Ajouter le type dans le nom de fichier
-            filename = f"{prompt}_{timestamp}_{image_type}_{i}.png"
-            path = type_folder / filename
-            
+            path = type_folder / f"{prompt}_{timestamp}_{image_type}_{i}.png"
+
             try:
-                # Préparer toutes les métadonnées dans un dictionnaire
-                all_metadata = {}
-                
-                # Métadonnées de base
-                all_metadata["prompt"] = _clean_metadata_value(job.params.prompt)
-                all_metadata["negative_prompt"] = _clean_metadata_value(job.params.metadata.get("negative_prompt", ""))
-                all_metadata["seed"] = job.params.seed
-                all_metadata["strength"] = job.params.strength
-                all_metadata["style"] = _clean_metadata_value(job.params.metadata.get("style", ""))
-                all_metadata["checkpoint"] = _clean_metadata_value(job.params.metadata.get("checkpoint", ""))
-                all_metadata["sampler"] = _clean_metadata_value(job.params.metadata.get("sampler", ""))
-                
-                # Métadonnées de génération
-                all_metadata["generation_type"] = image_type
-                all_metadata["job_kind"] = job.kind.name
-                all_metadata["timestamp"] = job.timestamp.strftime('%Y-%m-%d %H:%M:%S')
-                all_metadata["batch_index"] = i
-                all_metadata["total_images"] = len(job.results)
-                
-                # Métadonnées techniques
-                if "loras" in job.params.metadata:
-                    loras = job.params.metadata["loras"]
-                    if isinstance(loras, list):
-                        lora_list = []
-                        for lora in loras:
-                            if isinstance(lora, dict) and lora.get("enabled", True):
-                                lora_list.append({
-                                    "name": _clean_metadata_value(lora.get("name", "Unknown")),
-                                    "strength": lora.get("strength", 1.0)
-                                })
-                        all_metadata["loras"] = lora_list
-                    else:
-                        all_metadata["loras"] = str(loras)
-                
-                # Ajouter toutes les autres métadonnées du job
-                for key, value in job.params.metadata.items():
-                    if key not in ["prompt", "negative_prompt", "style", "checkpoint", "sampler", "loras"]:
-                        # Nettoyer et limiter la taille des valeurs
-                        clean_value = _clean_metadata_value(str(value))
-                        if len(clean_value) > 500:  # Limiter à 500 caractères
-                            clean_value = clean_value[:497] + "..."
-                        all_metadata[f"param_{key}"] = clean_value
-                
-                # Convertir en JSON compact et nettoyer
-                import json
-                metadata_json = json.dumps(all_metadata, ensure_ascii=False, separators=(',', ':'))
-                
-                # Limiter la taille totale du JSON (max 4KB)
-                if len(metadata_json) > 4000:
-                    # Tronquer en gardant les métadonnées essentielles
-                    essential_metadata = {
-                        "prompt": all_metadata.get("prompt", ""),
-                        "seed": all_metadata.get("seed", 0),
-                        "strength": all_metadata.get("strength", 1.0),
-                        "generation_type": all_metadata.get("generation_type", ""),
-                        "timestamp": all_metadata.get("timestamp", ""),
-                        "truncated": True
-                    }
-                    metadata_json = json.dumps(essential_metadata, ensure_ascii=False, separators=(',', ':'))
-                
-                # Créer le dictionnaire de métadonnées pour QImageWriter
-                metadata = {"metadata": metadata_json}
+                # Métadonnées pour QImageWriter - seul batch_index varie
+                metadata = {"metadata": _image_metadata_json(job_metadata, i)}
                 
                 # Sauvegarder avec métadonnées
                 img.save(str(path), metadata=metadata)
                 total_saved += 1
-                log.info(f"History save: successfully saved {path} with JSON metadata ({len(metadata_json)} chars)")
+                log.info(f"History save: successfully saved {path} with JSON metadata")
             except Exception as e:
                 log.warning(f"History save failed for {path}: {e}")
     
@@ -1,4 +1,5 @@
 from __future__ import annotations
+from contextlib import contextmanager
 from dataclasses import dataclass
 import os
 import json
@@ -394,13 +395,40 @@ class Settings(QObject):
             if self._values[name] != value:
                 self._values[name] = value
                 if name != "document_defaults":
-                    self.changed.emit(name, value)
+                    if getattr(self, "_batch_changes", None) is not None:
+                        self._batch_changes[name] = value
+                    else:
+                        self.changed.emit(name, value)
                 if name == "performance_preset":
                     self.apply_performance_preset(value)
                 # Language changes are handled in settings only
         else:
             object.__setattr__(self, name, value)
 
+    @contextmanager
+    def batch_update(self):
+        """Group assignments so each key notifies once, on exit.
+
+        Repeated writes to the same key collapse into its final value, but
+        every distinct key still emits - listeners filter by key name.
+        Re-entrant: nested batches merge into the outermost one, which
+        emits when it exits.
+        """
+        depth = getattr(self, "_batch_depth", 0)
+        if depth == 0:
+            object.__setattr__(self, "_batch_changes", {})
+        object.__setattr__(self, "_batch_depth", depth + 1)
+        try:
+            yield self
+        finally:
+            depth = self._batch_depth - 1
+            object.__setattr__(self, "_batch_depth", depth)
+            if depth == 0:
+                changes = self._batch_changes
+                object.__setattr__(self, "_batch_changes", None)
+                for name, value in changes.items():
+                    self.changed.emit(name, value)
+
     def restore(self, init=False):
         self.__dict__["_values"] = {
             k[1:]: v.default for k, v in Settings.__dict__.items() if isinstance(v, Setting)
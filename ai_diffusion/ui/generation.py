@@ -994,10 +994,15 @@ class GenerationWidget(QWidget):
         self.generate_button.operation = text
         self.generate_button.setIcon(theme.icon(icon))
     
-    def _update_metadata_visibility(self):
+    def _update_metadata_visibility(self, key=None, value=None):
         """Met à jour la visibilité de l'interface des métadonnées selon le paramètre"""
+        # Ne réagir qu'au paramètre concerné - settings.changed est émis pour
+        # chaque écriture et setVisible force un relayout complet du widget
+        if key is not None and key != "show_metadata_interface":
+            return
         from ..settings import settings
-        self.metadata_widget.setVisible(settings.show_metadata_interface)
+        if self.metadata_widget.isVisible() != settings.show_metadata_interface:
+            self.metadata_widget.setVisible(settings.show_metadata_interface)
     
 
 